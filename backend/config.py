@@ -1,3 +1,14 @@
+import os
+
 CONFIG = {
     "max_file_size": 1024 * 1024,  # 1 MB
+    "zip_cache_max_bytes": 200 * 1024 * 1024,  # 200 MB of cached ZIP source entries
+    "generated_output_cache_max_bytes": 200 * 1024 * 1024,  # 200 MB of cached generate-* outputs
+    # Re-count full-context tokens after assembly instead of trusting the per-section sum
+    "verify_context_tokens": os.getenv("VERIFY_CONTEXT_TOKENS", "").lower() in ("1", "true", "yes"),
+    # Look up the latest commit without a token so public GitHub repos can use the
+    # output cache; off by default since it spends the shared 60/hour anonymous quota
+    "anonymous_commit_lookup": os.getenv("ANONYMOUS_COMMIT_LOOKUP", "").lower() in ("1", "true", "yes"),
+    # Worker processes for graph generation; 0 runs it in a thread of the API process instead
+    "graph_worker_processes": int(os.getenv("GRAPH_WORKER_PROCESSES", min(4, os.cpu_count() or 1))),
 }
\ No newline at end of file
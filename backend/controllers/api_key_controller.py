@@ -2,6 +2,9 @@
 Enhanced API key controller integrated with LLM service
 Handles API key verification, saving, and management for users
 """
+import asyncio
+import time
+from collections import OrderedDict
 from fastapi import HTTPException, Form
 from typing import Annotated, Optional
 from utils.llm_utils import llm_service
@@ -12,6 +15,90 @@ from datetime import datetime, timezone
 from schemas.chat_schemas import AvailableModelsResponse
 
 
+# The model catalog is static per process; key status changes only via this controller
+MODELS_CACHE_TTL_SECONDS = 300
+USER_KEYS_CACHE_TTL_SECONDS = 30
+USER_KEYS_CACHE_MAX_SIZE = 10_000
+
+_models_cache: dict = {"data": None, "expires_at": 0.0}
+_models_lock = asyncio.Lock()
+# user_id -> (expires_at, providers); empty lists are cached too. Not locked:
+# concurrent misses for one user just fill the same entry twice
+_user_keys_cache: "OrderedDict[str, tuple[float, list[str]]]" = OrderedDict()
+
+
+def _build_models_catalog() -> dict:
+    """Collect available models and their detailed configurations"""
+    all_models = llm_service.get_available_models()
+    detailed_models = {}
+    for prov, models in all_models.items():
+        detailed_models[prov] = []
+        for model in models:
+            config = llm_service.get_model_config(prov, model)
+            if config:
+                detailed_models[prov].append({
+                    "name": model,
+                    "max_tokens": config.max_tokens,
+                    "max_output_tokens": config.max_output_tokens,
+                    "supports_function_calling": config.supports_function_calling,
+                    "supports_vision": config.supports_vision,
+                    "is_reasoning_model": config.is_reasoning_model,
+                    "knowledge_cutoff": config.knowledge_cutoff,
+                    "cost_per_1M_input": config.cost_per_1M_input,
+                    "cost_per_1M_output": config.cost_per_1M_output
+                })
+    return {"models": all_models, "detailed_models": detailed_models}
+
+
+async def get_models_catalog() -> dict:
+    """Return the cached model catalog, rebuilding it once per TTL"""
+    if _models_cache["data"] is not None and _models_cache["expires_at"] > time.monotonic():
+        return _models_cache["data"]
+    async with _models_lock:
+        # Another request may have refreshed the cache while we waited
+        if _models_cache["data"] is not None and _models_cache["expires_at"] > time.monotonic():
+            return _models_cache["data"]
+        _models_cache["data"] = _build_models_catalog()
+        _models_cache["expires_at"] = time.monotonic() + MODELS_CACHE_TTL_SECONDS
+        return _models_cache["data"]
+
+
+def _decrypts(encrypted_key: str) -> bool:
+    try:
+        return bool(llm_service.decrypt_api_key(encrypted_key))
+    except Exception:
+        return False
+
+
+async def get_user_key_providers(user: User) -> list[str]:
+    """Return providers the user has usable active keys for, cached briefly per user"""
+    user_id = str(user.id)
+    cached = _user_keys_cache.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    user_keys = await UserApiKey.find(
+        UserApiKey.user.id == BeanieObjectId(user.id),
+        UserApiKey.is_active == True
+    ).to_list()
+    # Like llm_service.get_user_api_key: the first active key per provider
+    # counts only if it decrypts to a usable key
+    first_keys = {}
+    for key in user_keys:
+        first_keys.setdefault(key.provider, key)
+    providers = [
+        provider for provider, key in first_keys.items() if _decrypts(key.encrypted_key)
+    ]
+    _user_keys_cache[user_id] = (time.monotonic() + USER_KEYS_CACHE_TTL_SECONDS, providers)
+    _user_keys_cache.move_to_end(user_id)
+    while len(_user_keys_cache) > USER_KEYS_CACHE_MAX_SIZE:
+        _user_keys_cache.popitem(last=False)
+    return providers
+
+
+def invalidate_user_key_cache(user: User) -> None:
+    """Drop cached key status after a user's keys change"""
+    _user_keys_cache.pop(str(user.id), None)
+
 
 class ApiKeyController:
     """Enhanced controller for API key verification and management"""
@@ -106,6 +193,8 @@ class ApiKeyController:
                 verify=verify_key
             )
             
+            invalidate_user_key_cache(user)
+            
             # Update key_name if provided
             if key_name and saved_key:
                 saved_key.key_name = key_name
@@ -211,6 +300,7 @@ class ApiKeyController:
             # Hard delete for security reasons - completely remove the API key from database
             deleted_at = datetime.now(timezone.utc)
             await user_key.delete()
+            invalidate_user_key_cache(user)
             
             return {
                 "success": True,
@@ -232,42 +322,23 @@ class ApiKeyController:
         """Get available models for all providers or a specific provider"""
         try:
             
-            # Get available models from llm_service
-            all_models = llm_service.get_available_models()
+            catalog = await get_models_catalog()
+            all_models = catalog["models"]
             
             if provider:
                 if provider not in all_models:
                     raise HTTPException(status_code=404, detail=f"Provider '{provider}' not found")
                 models_data = {provider: all_models[provider]}
+                detailed_models = {provider: catalog["detailed_models"][provider]}
             else:
                 models_data = all_models
+                detailed_models = catalog["detailed_models"]
             
             # Check which providers user has keys for
             user_has_keys = []
             if user:
-                for prov in models_data.keys():
-                    user_key = await llm_service.get_user_api_key(user, prov)
-                    if user_key:
-                        user_has_keys.append(prov)
-            
-            # Get detailed model configurations
-            detailed_models = {}
-            for prov, models in models_data.items():
-                detailed_models[prov] = []
-                for model in models:
-                    config = llm_service.get_model_config(prov, model)
-                    if config:
-                        detailed_models[prov].append({
-                            "name": model,
-                            "max_tokens": config.max_tokens,
-                            "max_output_tokens": config.max_output_tokens,
-                            "supports_function_calling": config.supports_function_calling,
-                            "supports_vision": config.supports_vision,
-                            "is_reasoning_model": config.is_reasoning_model,
-                            "knowledge_cutoff": config.knowledge_cutoff,
-                            "cost_per_1M_input": config.cost_per_1M_input,
-                            "cost_per_1M_output": config.cost_per_1M_output
-                        })
+                key_providers = await get_user_key_providers(user)
+                user_has_keys = [prov for prov in models_data if prov in key_providers]
             
             return {
                 "success": True,
@@ -345,12 +416,7 @@ class ApiKeyController:
         """Get available models with user's key status - returns AvailableModelsResponse schema"""
         try:
             # Get user's keys
-            user_keys = await UserApiKey.find(
-                UserApiKey.user.id == BeanieObjectId(user.id),
-                UserApiKey.is_active == True
-            ).to_list()
-            
-            user_has_keys = [key.provider for key in user_keys]
+            user_has_keys = await get_user_key_providers(user)
             
             # Get available models from LangChain service
             from utils.langchain_llm_service import langchain_service
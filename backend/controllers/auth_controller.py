@@ -1,10 +1,10 @@
 from schemas.auth_schemas import LoginRequest, LoginResponse
 from fastapi import HTTPException, status
-import httpx
+from utils.http_client import get_http_client
 
 
 from models.user import User
-from utils.jwt_utils import create_tokens
+from utils.jwt_utils import create_tokens, invalidate_cached_user
 
 from beanie.operators import Or
 
@@ -20,31 +20,31 @@ async def get_github_user(access_token: str) -> dict:
         "User-Agent": "GitVizz-Backend/1.0"
     }
 
-    async with httpx.AsyncClient() as client:
-        # Step 1: Get basic user info
-        user_res = await client.get("https://api.github.com/user", headers=headers)
-        if user_res.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid GitHub token")
+    client = get_http_client()
+    # Step 1: Get basic user info
+    user_res = await client.get("https://api.github.com/user", headers=headers)
+    if user_res.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid GitHub token")
 
-        user_data = user_res.json()
+    user_data = user_res.json()
 
-        # Step 2: Try to get verified, primary email
-        email_res = await client.get(
-            "https://api.github.com/user/emails", headers=headers
-        )
-        if email_res.status_code == 200:
-            emails = email_res.json()
-            for e in emails:
-                if e.get("primary") and e.get("verified"):
-                    user_data["email"] = e["email"]
-                    break
-
-        return {
-            "fullname": user_data.get("name"),
-            "username": user_data["login"],
-            "email": user_data.get("email"),  # May be None if private
-            "avatar_url": user_data["avatar_url"],
-        }
+    # Step 2: Try to get verified, primary email
+    email_res = await client.get(
+        "https://api.github.com/user/emails", headers=headers
+    )
+    if email_res.status_code == 200:
+        emails = email_res.json()
+        for e in emails:
+            if e.get("primary") and e.get("verified"):
+                user_data["email"] = e["email"]
+                break
+
+    return {
+        "fullname": user_data.get("name"),
+        "username": user_data["login"],
+        "email": user_data.get("email"),  # May be None if private
+        "avatar_url": user_data["avatar_url"],
+    }
 
 
 async def login_user(request: LoginRequest) -> LoginResponse:
@@ -80,6 +80,7 @@ async def login_user(request: LoginRequest) -> LoginResponse:
     else:
         user.github_access_token = request.access_token
         await user.save()  # Update the existing user in the database
+        invalidate_cached_user(str(user.id))
 
 
     # Step 4: Create tokens for the user
@@ -1,28 +1,243 @@
-import json
+import asyncio
+import heapq
+import math
 import os
+import re
 from fastapi import HTTPException, Form
-from typing import Optional, AsyncGenerator, Annotated
+from typing import Optional, AsyncGenerator, AsyncIterator, Annotated, Iterator
 import uuid
 import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 import logging
 from beanie import BeanieObjectId
-from models.chat import ChatSession, Conversation
+from beanie.operators import In
+from models.chat import ChatSession, Conversation, ChatSessionSummary, ConversationSummary
 from models.repository import Repository
 from models.user import User
 from utils.llm_utils import llm_service
-from utils.file_utils import file_manager
-from utils.repo_utils import extract_zip_contents, smart_filter_files, format_repo_contents, cleanup_temp_files
+from utils.langchain_llm_service import langchain_service
+from config import CONFIG
+from utils.file_utils import file_manager, read_text_prefix, text_content_size
+from utils.async_utils import prefetch
+from utils.json_utils import NDJSONBuffer, ndjson_bytes
+from utils.repo_utils import format_repo_contents
+from utils.repo_utils import read_zip_source_entries, smart_filter_zip_entries, zip_entry_to_file_info
 from utils.repo_utils import find_user_repository
 from schemas.chat_schemas import (
     ChatResponse, ConversationHistoryResponse, 
     ChatSessionResponse, ChatSettingsResponse,
-    ContextSearchResponse, MessageResponse, StreamChatResponse, ChatSessionListItem, ChatSessionListResponse
+    ContextSearchResponse, MessageResponse, ChatSessionListItem, ChatSessionListResponse
 )
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# System prompt for non-streaming chat; the repository context is substituted per request
+CHAT_SYSTEM_PROMPT_TEMPLATE = """You are an AI assistant specialized in code analysis and repository exploration. You have access to the complete codebase and can help with:
+- Code explanation and documentation
+- Architecture understanding
+- Bug identification and debugging
+- Implementation suggestions
+- Best practices recommendations
+
+Repository: {repo_name}
+Branch: {branch}
+
+Repository Context:
+{context}
+
+Provide detailed, accurate responses based on the repository content. Reference specific files and line numbers when relevant."""
+
+# Prompt tokens served from the provider's prompt cache are billed at half price
+CACHED_TOKEN_BILLING_RATE = 0.5
+
+
+def with_billable_tokens(usage: Optional[dict]) -> Optional[dict]:
+    """Annotate provider usage with billable tokens, discounting prompt-cache hits"""
+    if not usage:
+        return usage
+    cached_tokens = usage.get("cached_tokens", 0) or 0
+    total_tokens = usage.get("total_tokens", 0) or 0
+    return {
+        **usage,
+        "cached_tokens": cached_tokens,
+        "billable_tokens": total_tokens - (1 - CACHED_TOKEN_BILLING_RATE) * cached_tokens
+    }
+
+
+# Length of the repository context excerpt stored with each assistant message
+CONTEXT_PREVIEW_CHARS = 500
+
+
+def preview_context(context: str) -> str:
+    """Shorten repository context to the excerpt stored as a message's context_used"""
+    if len(context) <= CONTEXT_PREVIEW_CHARS:
+        return context
+    return context[:CONTEXT_PREVIEW_CHARS] + "..."
+
+
+# Characters per token used to estimate file sections while assembling full context;
+# matches the default ratio of the LangChain approximate counter
+SECTION_CHARS_PER_TOKEN = 4.0
+
+
+def estimate_section_tokens(text: str) -> int:
+    """Cheap per-file token estimate; the assembled context gets one real count"""
+    return math.ceil(len(text) / SECTION_CHARS_PER_TOKEN)
+
+
+# Full-context file ordering by extension (README files come first, unknown types last)
+FILE_PRIORITY_BY_EXTENSION = {
+    **dict.fromkeys(('.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs'), 1),
+    **dict.fromkeys(('.json', '.yaml', '.yml', '.xml'), 2),
+    **dict.fromkeys(('.md', '.txt', '.rst'), 3),
+}
+
+
+# Section token counts per archive version: (zip path, mtime_ns, size) -> {file path: tokens}
+FILE_TOKEN_CACHE_MAX_ARCHIVES = 64
+_file_token_cache: "OrderedDict[tuple, dict[str, int]]" = OrderedDict()
+
+
+def archive_token_counts(archive_key: tuple) -> dict[str, int]:
+    """Return the (mutable) per-file token count cache for one archive version"""
+    counts = _file_token_cache.get(archive_key)
+    if counts is not None:
+        _file_token_cache.move_to_end(archive_key)
+        return counts
+    counts = {}
+    _file_token_cache[archive_key] = counts
+    while len(_file_token_cache) > FILE_TOKEN_CACHE_MAX_ARCHIVES:
+        _file_token_cache.popitem(last=False)
+    return counts
+
+
+# Assembled full contexts per (archive version, model, token budget); assembly is
+# deterministic, so repeat turns against an unchanged ZIP reuse the result
+FULL_CONTEXT_CACHE_TTL_SECONDS = 3600
+FULL_CONTEXT_CACHE_MAX_ENTRIES = 32
+_full_context_cache: "OrderedDict[tuple, tuple[float, str, dict]]" = OrderedDict()
+
+
+def get_cached_full_context(cache_key: tuple) -> Optional[tuple[str, dict]]:
+    """Return a cached (context, metadata) pair, or None when missing or expired"""
+    cached = _full_context_cache.get(cache_key)
+    if cached is None:
+        return None
+    expires_at, context, metadata = cached
+    if expires_at <= time.monotonic():
+        del _full_context_cache[cache_key]
+        return None
+    _full_context_cache.move_to_end(cache_key)
+    return context, dict(metadata)
+
+
+def cache_full_context(cache_key: tuple, context: str, metadata: dict) -> None:
+    """Store an assembled full context, evicting the least recently used entries"""
+    _full_context_cache[cache_key] = (time.monotonic() + FULL_CONTEXT_CACHE_TTL_SECONDS, context, dict(metadata))
+    _full_context_cache.move_to_end(cache_key)
+    while len(_full_context_cache) > FULL_CONTEXT_CACHE_MAX_ENTRIES:
+        _full_context_cache.popitem(last=False)
+
+
+# One scan classifies provider errors; first matching phrase wins
+_CHAT_ERROR_RE = re.compile(r"(no user api key found|invalid api key|quota|rate limit|invalid model)", re.IGNORECASE)
+_CHAT_ERROR_TYPES = {
+    "no user api key found": "no_api_key",
+    "invalid api key": "no_api_key",
+    "quota": "quota_exceeded",
+    "rate limit": "quota_exceeded",
+    "invalid model": "invalid_model",
+}
+
+
+def classify_chat_error(error_message: str) -> str:
+    """Map an LLM/provider error message to the error_type reported to clients"""
+    match = _CHAT_ERROR_RE.search(error_message)
+    if not match:
+        return "server_error"
+    return _CHAT_ERROR_TYPES.get(match.group(1).lower(), "server_error")
+
+
+# Bumped when the NDJSON event layout changes; 2 = identifiers only in the "start" event
+CHAT_STREAM_VERSION = "2"
+
+
+# Token events after the first are merged into micro-batches to cut per-frame overhead
+TOKEN_FLUSH_INTERVAL_SECONDS = 0.02
+MAX_ACCUMULATED_TOKENS = 64
+
+
+async def coalesce_token_events(chunks: AsyncIterator[str]) -> AsyncGenerator[dict, None]:
+    """Parse NDJSON stream chunks into events, merging bursts of token events.
+
+    The first token is emitted as soon as it arrives. Later tokens are held for at
+    most TOKEN_FLUSH_INTERVAL_SECONDS or MAX_ACCUMULATED_TOKENS and sent as one
+    event; any other event flushes pending tokens first so ordering is preserved.
+    """
+    ndjson_buffer = NDJSONBuffer()
+    pending: Optional[dict] = None
+    parts: list[str] = []
+    first_token_sent = False
+    deadline = 0.0
+
+    def flush() -> dict:
+        nonlocal pending
+        event = {**pending, "token": "".join(parts)}
+        pending = None
+        parts.clear()
+        return event
+
+    def handle(events: Iterator) -> Iterator[dict]:
+        nonlocal pending, first_token_sent, deadline
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            if event.get("event") != "token":
+                if pending is not None:
+                    yield flush()
+                yield event
+            elif not first_token_sent:
+                first_token_sent = True
+                yield event
+            else:
+                if pending is None:
+                    pending = event
+                    deadline = time.monotonic() + TOKEN_FLUSH_INTERVAL_SECONDS
+                parts.append(event.get("token", ""))
+                if len(parts) >= MAX_ACCUMULATED_TOKENS or time.monotonic() >= deadline:
+                    yield flush()
+
+    iterator = chunks.__aiter__()
+    next_chunk = None
+    try:
+        while True:
+            if next_chunk is None:
+                next_chunk = asyncio.ensure_future(iterator.__anext__())
+            if pending is not None:
+                # Don't hold buffered tokens while the upstream is quiet
+                done, _ = await asyncio.wait({next_chunk}, timeout=max(0.0, deadline - time.monotonic()))
+                if not done:
+                    yield flush()
+                    continue
+            try:
+                chunk = await next_chunk
+            except StopAsyncIteration:
+                break
+            finally:
+                if next_chunk.done():
+                    next_chunk = None
+            for event in handle(ndjson_buffer.feed(chunk)):
+                yield event
+        for event in handle(ndjson_buffer.flush()):
+            yield event
+        if pending is not None:
+            yield flush()
+    finally:
+        if next_chunk is not None and not next_chunk.done():
+            next_chunk.cancel()
+
 class ChatController:
     """Controller for handling chat-related operations"""
     
@@ -108,13 +323,37 @@ class ChatController:
         Returns:
             Tuple of (context_text, context_metadata)
         """
-        temp_dirs_to_cleanup = []
-        
         try:
             # First try to load from cached text file if it exists
             if repository.file_paths and repository.file_paths.text:
                 try:
-                    cached_content = await file_manager.load_text_content(repository.file_paths.text)
+                    text_path = repository.file_paths.text
+                    text_size = await asyncio.to_thread(text_content_size, text_path)
+                    
+                    # A file far beyond the token budget would be cut to ~90% of the
+                    # budget below anyway, so only that prefix is read (mmap for large files)
+                    char_budget = int(max_context_tokens * SECTION_CHARS_PER_TOKEN)
+                    if text_size > 2 * char_budget:
+                        logger.info(f"Cached content exceeds limit ({text_size} bytes), reading prefix only...")
+                        prefix = await asyncio.to_thread(read_text_prefix, text_path, int(char_budget * 0.9))
+                        cached_content = prefix + "\n\n... (content truncated due to token limit)"
+                        actual_tokens = math.ceil(text_size / SECTION_CHARS_PER_TOKEN)
+                        return cached_content, {
+                            "source": "cached_text",
+                            "repository_id": str(repository.id),
+                            "repository_name": repository.repo_name,
+                            "content_length": text_size,
+                            "scope": scope_preference,
+                            "search_query": context_search_query,
+                            "actual_tokens": actual_tokens,
+                            "model_used_for_counting": model,
+                            "truncated": True,
+                            "truncated_at_tokens": max_context_tokens,
+                            "final_tokens": langchain_service.count_tokens_approximately(cached_content),
+                            "truncation_ratio": max_context_tokens / actual_tokens
+                        }
+                    
+                    cached_content = await file_manager.load_text_content(text_path)
                     if cached_content:
                         logger.info(f"Using cached text content for repository {repository.repo_name}")
                         context_metadata = {
@@ -127,7 +366,6 @@ class ChatController:
                         }
                         
                         # Use intelligent token-aware truncation for cached content
-                        from utils.langchain_llm_service import langchain_service
                         actual_tokens = langchain_service.count_tokens_approximately(cached_content)
                         context_metadata["actual_tokens"] = actual_tokens
                         context_metadata["model_used_for_counting"] = model
@@ -174,20 +412,12 @@ class ChatController:
                     "repository_name": repository.repo_name
                 }
             
-            # Extract ZIP contents
-            extracted_files, temp_extract_dir = extract_zip_contents(zip_file_path)
-            temp_dirs_to_cleanup.append(temp_extract_dir)
-            
-            if not extracted_files:
-                return "", {
-                    "source": "error",
-                    "error": "No files found in ZIP archive",
-                    "repository_id": str(repository.id),
-                    "repository_name": repository.repo_name
-                }
-            
-            # Filter files to include only relevant source code files
-            filtered_files = smart_filter_files(extracted_files, temp_extract_dir)
+            # Read source entries from the ZIP (cached per archive mtime) and
+            # filter them in memory instead of extracting to a temp directory;
+            # decompressing and decoding run in one worker thread, off the event loop
+            filtered_files = await asyncio.to_thread(
+                lambda: smart_filter_zip_entries(read_zip_source_entries(zip_file_path))
+            )
             
             if not filtered_files:
                 return "", {
@@ -197,9 +427,6 @@ class ChatController:
                     "repository_name": repository.repo_name
                 }
             
-            # Use intelligent token-aware truncation with LangChain utilities
-            from utils.langchain_llm_service import langchain_service
-            
             # Format repository contents into LLM-friendly text
             context_text = format_repo_contents(filtered_files)
             
@@ -262,10 +489,6 @@ class ChatController:
                 "repository_id": str(repository.id),
                 "repository_name": repository.repo_name
             }
-        finally:
-            # Clean up temporary directories
-            if temp_dirs_to_cleanup:
-                cleanup_temp_files(temp_dirs_to_cleanup)
 
     async def get_api_key_for_request(self, user: User, provider: str, use_user: bool = False) -> Optional[str]:
         """
@@ -354,6 +577,7 @@ class ChatController:
                 model=model,
                 provider=provider
             )
+            context_preview = preview_context(context)
             
             # Prepare messages for LLM with intelligent context window management
             recent_messages = conversation.messages[-20:]  # Get more recent context
@@ -372,20 +596,11 @@ class ChatController:
             # Generate AI response using the new LLM service
             try:
                 # Prepare system prompt with repository context
-                system_prompt = f"""You are an AI assistant specialized in code analysis and repository exploration. You have access to the complete codebase and can help with:
-- Code explanation and documentation
-- Architecture understanding
-- Bug identification and debugging
-- Implementation suggestions
-- Best practices recommendations
-
-Repository: {chat_session.repository.repo_name}
-Branch: {chat_session.repository.branch}
-
-Repository Context:
-{context}
-
-Provide detailed, accurate responses based on the repository content. Reference specific files and line numbers when relevant."""
+                system_prompt = CHAT_SYSTEM_PROMPT_TEMPLATE.format(
+                    repo_name=chat_session.repository.repo_name,
+                    branch=chat_session.repository.branch,
+                    context=context
+                )
 
                 llm_response = await llm_service.generate(
                     messages=messages,
@@ -414,11 +629,9 @@ Provide detailed, accurate responses based on the repository content. Reference
                     )
                 
             except Exception as e:
-                # Handle API key errors specifically
-                error_type = "server_error"
+                # Handle API key, quota and model errors specifically
                 error_message = str(e)
-                if "no user api key found" in error_message.lower() or "invalid api key" in error_message.lower():
-                    error_type = "no_api_key"
+                error_type = classify_chat_error(error_message)
                 
                 return ChatResponse(
                     success=False,
@@ -428,19 +641,21 @@ Provide detailed, accurate responses based on the repository content. Reference
                     conversation_id=conversation_id
                 )
             
+            usage = with_billable_tokens(llm_response.usage)
+            
             # Add AI response to conversation
             conversation.add_message(
                 "assistant", 
                 llm_response.content,
-                context_used=context[:500] + "..." if len(context) > 500 else context,
-                metadata=llm_response.usage or {}
+                context_used=context_preview,
+                metadata=usage or {}
             )
             
-            # Update conversation metadata
-            if llm_response.usage:
-                conversation.total_tokens_used += llm_response.usage.get("total_tokens", 0)
+            # Update conversation metadata and today's usage on the session
+            conversation.record_usage(usage)
+            chat_session.record_daily_usage(usage)
             
-            await conversation.save()
+            await asyncio.gather(conversation.save(), chat_session.save())
             
             # Calculate response time
             response_time = time.time() - start_time
@@ -449,7 +664,10 @@ Provide detailed, accurate responses based on the repository content. Reference
             daily_usage = {
                 "requests_used": chat_session.daily_requests_count,
                 "requests_limit": 50 if not chat_session.use_own_key else -1,
-                "reset_date": (datetime.now(timezone.utc) + timedelta(days=1)).date().isoformat()
+                "reset_date": (datetime.now(timezone.utc) + timedelta(days=1)).date().isoformat(),
+                "tokens_used": chat_session.daily_tokens_used,
+                "cached_tokens": chat_session.daily_cached_tokens,
+                "billable_tokens": chat_session.daily_billable_tokens
             }
             
             return ChatResponse(
@@ -457,9 +675,9 @@ Provide detailed, accurate responses based on the repository content. Reference
                 chat_id=chat_session.chat_id,
                 conversation_id=conversation_id,
                 ai_response=llm_response.content,
-                context_used=context[:500] + "..." if len(context) > 500 else context,
+                context_used=context_preview,
                 context_metadata=context_metadata,
-                usage=llm_response.usage,
+                usage=usage,
                 model_used=llm_response.model,
                 provider=llm_response.provider,
                 response_time=response_time,
@@ -802,8 +1020,8 @@ Provide detailed, accurate responses based on the repository content. Reference
         temperature: Annotated[float, Form(description="Response randomness (0.0-2.0)", ge=0.0, le=2.0)] = 0.7,
         max_tokens: Annotated[Optional[int], Form(description="Maximum tokens in response (1-4000)", ge=1, le=4000)] = None,
         context_mode: Annotated[str, Form(description="Context mode: full, smart, or agentic")] = ""
-    ) -> AsyncGenerator[str, None]:
-        """Process a chat message with streaming response - yields JSON strings"""
+    ) -> AsyncGenerator[bytes, None]:
+        """Process a chat message with streaming response - yields encoded NDJSON lines"""
         
         # =========================================================
         # START: THIS IS THE FIX 
@@ -813,36 +1031,44 @@ Provide detailed, accurate responses based on the repository content. Reference
 
         try:
             if not repository_id or repository_id.strip() == "":
-                yield json.dumps(StreamChatResponse(
-                    event="error",
-                    error="Repository identifier is required for chat",
-                    error_type="validation_error"
-                ).model_dump()) + "\n"
+                yield ndjson_bytes({
+                    "event": "error",
+                    "error": "Repository identifier is required for chat",
+                    "error_type": "validation_error"
+                })
                 return
             
             if not message or message.strip() == "":
-                yield json.dumps(StreamChatResponse(
-                    event="error",
-                    error="Message cannot be empty",
-                    error_type="validation_error"
-                ).model_dump()) + "\n"
+                yield ndjson_bytes({
+                    "event": "error",
+                    "error": "Message cannot be empty",
+                    "error_type": "validation_error"
+                })
                 return
             
             chat_session = await self.get_or_create_chat_session(user, repository_id, None, chat_id)
             conversation_id = conversation_id or str(uuid.uuid4())
             
+            # Stream identifiers for the start and error events; events are plain
+            # dicts (shaped like StreamChatResponse) to skip per-event model validation
+            stream_base = {
+                "provider": provider,
+                "model": model,
+                "chat_id": chat_session.chat_id,
+                "conversation_id": conversation_id
+            }
+            
             try:
-                from utils.langchain_llm_service import langchain_service
                 available_providers = langchain_service.get_available_providers()
                 if provider not in available_providers:
-                    yield json.dumps(StreamChatResponse(event="error", error=f"Provider {provider} not available.").model_dump()) + "\n"
+                    yield ndjson_bytes({**stream_base, "event": "error", "error": f"Provider {provider} not available.", "error_type": "provider_unavailable"})
                     return
                 await langchain_service.get_api_key_with_fallback(provider, user, use_user)
             except ValueError as e:
-                yield json.dumps(StreamChatResponse(event="error", error=str(e), error_type="no_api_key").model_dump()) + "\n"
+                yield ndjson_bytes({**stream_base, "event": "error", "error": str(e), "error_type": "no_api_key"})
                 return
             except Exception as e:
-                yield json.dumps(StreamChatResponse(event="error", error=f"Service initialization error: {str(e)}").model_dump()) + "\n"
+                yield ndjson_bytes({**stream_base, "event": "error", "error": f"Service initialization error: {str(e)}", "error_type": "service_error"})
                 return
             
             conversation = await Conversation.find_one(
@@ -862,12 +1088,16 @@ Provide detailed, accurate responses based on the repository content. Reference
                 if hasattr(conversation.repository, 'id') and not hasattr(conversation.repository, 'file_paths'):
                     conversation.repository = await Repository.get(conversation.repository.id)
             
+            # Identifiers are sent once up front; later progress/token frames omit them
+            yield ndjson_bytes({"event": "start", **stream_base})
+            
             conversation.add_message("user", message)
             
             context, context_metadata = await self.get_repository_context_by_mode(
                 chat_session.repository, context_mode, user_query=message,
                 max_context_tokens=max_tokens or 8000, model=model, provider=provider
             )
+            context_preview = preview_context(context)
             
             # This 'if' block will now correctly execute
             if context_mode == "agentic":
@@ -885,34 +1115,74 @@ Provide detailed, accurate responses based on the repository content. Reference
                     provider=provider, thread_id=f"{chat_session.chat_id}_{conversation_id}",
                     repository_context=context, context_metadata=context_metadata
                 )
+            # Let the upstream produce its next chunk while this one is being sent
+            response_generator = prefetch(response_generator)
             
-            response_content = ""
+            # Collect tokens in a list and join once; += on str is O(N^2) over a long stream
+            response_parts: list[str] = []
             final_usage = {}
             
-            async for json_chunk in response_generator:
-                yield json_chunk # Directly pass the chunk from the service
-                try:
-                    chunk_data = json.loads(json_chunk.strip())
-                    if chunk_data.get("event") == "token":
-                        response_content += chunk_data.get("token", "")
-                    elif chunk_data.get("event") == "complete":
-                        final_usage = chunk_data.get("usage", {})
-                except (json.JSONDecodeError, AttributeError):
-                    continue
+            def collect(chunk_data: dict) -> None:
+                nonlocal final_usage
+                if chunk_data.get("event") == "token":
+                    response_parts.append(chunk_data.get("token", ""))
+                elif chunk_data.get("event") == "complete":
+                    final_usage = chunk_data.get("usage", {})
+            
+            async for event in coalesce_token_events(response_generator):
+                collect(event)
+                yield ndjson_bytes(event)
 
             # Save the final message after streaming is complete
+            response_content = "".join(response_parts)
+            final_usage = with_billable_tokens(final_usage)
             conversation.add_message(
                 "assistant", response_content, 
-                context_used=context[:500] + "...", 
+                context_used=context_preview, 
                 metadata=final_usage
             )
-            if final_usage:
-                conversation.total_tokens_used += final_usage.get("total_tokens", 0)
-            await conversation.save()
+            conversation.record_usage(final_usage)
+            chat_session.record_daily_usage(final_usage)
+            await asyncio.gather(conversation.save(), chat_session.save())
 
         except Exception as e:
-            error_response = StreamChatResponse(event="error", error=str(e), error_type="server_error")
-            yield json.dumps(error_response.model_dump()) + "\n"
+            yield ndjson_bytes({"event": "error", "error": str(e), "error_type": classify_chat_error(str(e))})
+            
+    async def _get_latest_conversation_ids(
+        self,
+        chat_ids: list[str],
+        user_object_id: BeanieObjectId
+    ) -> dict[str, str]:
+        """Map each chat_id to the conversation_id of its most recently updated conversation"""
+        if not chat_ids:
+            return {}
+        
+        try:
+            # Single aggregation: newest conversation per chat_id
+            latest_conversations = await Conversation.find(
+                In(Conversation.chat_id, chat_ids),
+                Conversation.user.id == user_object_id
+            ).aggregate([
+                {"$sort": {"updated_at": -1}},
+                {"$group": {"_id": "$chat_id", "conversation_id": {"$first": "$conversation_id"}}}
+            ]).to_list()
+            return {item["_id"]: item["conversation_id"] for item in latest_conversations}
+        except Exception as e:
+            logger.warning(f"Latest-conversation aggregation failed, falling back to per-session queries: {e}")
+        
+        # Fallback: overlap the per-session lookups, capped to avoid flooding MongoDB
+        semaphore = asyncio.Semaphore(16)
+        
+        async def latest_for_chat(chat_id: str):
+            async with semaphore:
+                conversations = await Conversation.find(
+                    Conversation.chat_id == chat_id,
+                    Conversation.user.id == user_object_id
+                ).sort(-Conversation.updated_at).limit(1).project(ConversationSummary).to_list()
+            return chat_id, conversations[0].conversation_id if conversations else None
+        
+        pairs = await asyncio.gather(*[latest_for_chat(chat_id) for chat_id in chat_ids])
+        return {chat_id: conversation_id for chat_id, conversation_id in pairs if conversation_id}
             
     async def list_user_chat_sessions(
         self,
@@ -934,24 +1204,18 @@ Provide detailed, accurate responses based on the repository content. Reference
                     total_sessions=0
                 )
             
-            # Get all chat sessions for this repository
+            # Get all chat sessions for this repository (only the fields the listing needs)
             chat_sessions = await ChatSession.find(
                 ChatSession.user.id == user_object_id,
                 ChatSession.is_active == True,
                 ChatSession.repository.id == repository.id
-            ).sort(-ChatSession.updated_at).to_list()
+            ).sort(-ChatSession.updated_at).project(ChatSessionSummary).to_list()
 
             # For each chat session, find the most recent conversation (if any)
-            conversation_map = {}
-            for session in chat_sessions:
-                conversations = await Conversation.find(
-                    Conversation.chat_id == session.chat_id,
-                    Conversation.user.id == user_object_id
-                ).sort(-Conversation.updated_at).limit(1).to_list()
-                
-                conversation = conversations[0] if conversations else None
-                if conversation:
-                    conversation_map[session.chat_id] = conversation.conversation_id
+            conversation_map = await self._get_latest_conversation_ids(
+                [session.chat_id for session in chat_sessions],
+                user_object_id
+            )
             
             # Only include sessions that have conversations (since conversation_id is required)
             sessions = []
@@ -997,7 +1261,7 @@ Provide detailed, accurate responses based on the repository content. Reference
             
             # Convert messages to response format
             messages_response = [
-                MessageResponse(
+                MessageResponse.model_construct(
                     role=msg.role,
                     content=msg.content,
                     timestamp=msg.timestamp,
@@ -1015,6 +1279,7 @@ Provide detailed, accurate responses based on the repository content. Reference
                 created_at=conversation.created_at,
                 updated_at=conversation.updated_at,
                 total_tokens_used=conversation.total_tokens_used,
+                cached_tokens_used=conversation.cached_tokens_used,
                 model_provider=conversation.model_provider,
                 model_name=conversation.model_name
             )
@@ -1029,54 +1294,59 @@ Provide detailed, accurate responses based on the repository content. Reference
     ) -> ChatSessionResponse:
         """Get chat session details with recent conversations"""
         try:
+            user_object_id = BeanieObjectId(user.id)
             
             # Fetch with linked repository included
             chat_session = await ChatSession.find_one(
                 ChatSession.chat_id == chat_id,
-                ChatSession.user.id == BeanieObjectId(user.id),
+                ChatSession.user.id == user_object_id,
                 fetch_links=True  # This will fetch the linked repository
             )
             
             if not chat_session:
                 raise HTTPException(status_code=404, detail="Chat session not found")
             
-            # Double-check that repository is fully loaded
-            if hasattr(chat_session.repository, 'id') and not hasattr(chat_session.repository, 'repo_name'):
-                chat_session.repository = await Repository.get(chat_session.repository.id)
+            # fetch_links resolves the repository; only fall back to a separate
+            # query (and surface it) when the link could not be resolved
+            if not isinstance(chat_session.repository, Repository):
+                logger.warning(f"Repository link unresolved for chat session {chat_id}; fetching it directly")
+                chat_session.repository = await chat_session.repository.fetch()
+                if not isinstance(chat_session.repository, Repository):
+                    raise HTTPException(status_code=404, detail="Repository for chat session not found")
             
             # Get conversations
             conversations = await Conversation.find(
                 Conversation.chat_id == chat_id,
-                Conversation.user.id == BeanieObjectId(user.id),  # Add user filter for security
+                Conversation.user.id == user_object_id,  # Add user filter for security
                 sort=(-Conversation.updated_at)
             ).to_list()
             
             # Prepare conversation responses
-            recent_conversations = []
-            for conv in conversations:
-                messages_response = [
-                    MessageResponse(
-                        role=msg.role,
-                        content=msg.content,
-                        timestamp=msg.timestamp,
-                        context_used=msg.context_used,
-                        metadata=msg.metadata
-                    )
-                    for msg in conv.messages
-                ]
-                recent_conversations.append(
-                    ConversationHistoryResponse(
-                        chat_id=conv.chat_id,
-                        conversation_id=conv.conversation_id,
-                        title=conv.title,
-                        messages=messages_response,
-                        created_at=conv.created_at,
-                        updated_at=conv.updated_at,
-                        total_tokens_used=conv.total_tokens_used,
-                        model_provider=conv.model_provider,
-                        model_name=conv.model_name
-                    )
+            # Stored messages were validated on write, so skip re-validating each one
+            recent_conversations = [
+                ConversationHistoryResponse(
+                    chat_id=conv.chat_id,
+                    conversation_id=conv.conversation_id,
+                    title=conv.title,
+                    messages=[
+                        MessageResponse.model_construct(
+                            role=msg.role,
+                            content=msg.content,
+                            timestamp=msg.timestamp,
+                            context_used=msg.context_used,
+                            metadata=msg.metadata
+                        )
+                        for msg in conv.messages
+                    ],
+                    created_at=conv.created_at,
+                    updated_at=conv.updated_at,
+                    total_tokens_used=conv.total_tokens_used,
+                    cached_tokens_used=conv.cached_tokens_used,
+                    model_provider=conv.model_provider,
+                    model_name=conv.model_name
                 )
+                for conv in conversations
+            ]
             
             # Determine daily limit
             daily_limit = 50
@@ -1181,23 +1451,37 @@ Provide detailed, accurate responses based on the repository content. Reference
                     query_used=query
                 )
             
-            # Simple search implementation
-            lines = content.split('\n')
+            # Single case-insensitive scan over the whole text; one result per matching line
+            pattern = re.compile(re.escape(query), re.IGNORECASE)
             results = []
-            for i, line in enumerate(lines):
-                if query.lower() in line.lower():
-                    # Capture surrounding context
-                    start = max(0, i - 1)
-                    end = min(len(lines), i + 2)
-                    context = "\n".join(lines[start:end])
-                    
-                    results.append({
-                        "line_number": i + 1,
-                        "content": line,
-                        "context": context
-                    })
-                    if len(results) >= max_results:
-                        break
+            line_number = 1
+            scanned_to = 0
+            last_line_start = -1
+            for match in pattern.finditer(content):
+                pos = match.start()
+                line_start = content.rfind('\n', 0, pos) + 1
+                if line_start == last_line_start:
+                    continue
+                line_number += content.count('\n', scanned_to, line_start)
+                scanned_to = line_start
+                last_line_start = line_start
+                
+                line_end = content.find('\n', pos)
+                if line_end == -1:
+                    line_end = len(content)
+                # Capture surrounding context
+                context_start = content.rfind('\n', 0, line_start - 1) + 1 if line_start else 0
+                context_end = content.find('\n', line_end + 1) if line_end < len(content) else -1
+                if context_end == -1:
+                    context_end = len(content)
+                
+                results.append({
+                    "line_number": line_number,
+                    "content": content[line_start:line_end],
+                    "context": content[context_start:context_end]
+                })
+                if len(results) >= max_results:
+                    break
             
             return ContextSearchResponse(
                 success=True,
@@ -1273,9 +1557,7 @@ Provide detailed, accurate responses based on the repository content. Reference
         max_context_tokens: int = 8000,
         model: str = "gpt-4o-mini"
     ) -> tuple[str, dict]:
-        """Get full repository context by extracting and including all files from ZIP"""
-        temp_dirs_to_cleanup = []
-        
+        """Get full repository context by including all source files from the ZIP"""
         try:
             # Check if we have a ZIP file to extract from
             if not repository.file_paths or not repository.file_paths.zip:
@@ -1283,110 +1565,149 @@ Provide detailed, accurate responses based on the repository content. Reference
             
             zip_file_path = repository.file_paths.zip
             
-            # Check if ZIP file exists
-            if not os.path.exists(zip_file_path):
+            # Filesystem and ZIP work runs in worker threads so concurrent streams aren't stalled
+            try:
+                zip_stat = await asyncio.to_thread(os.stat, zip_file_path)
+            except FileNotFoundError:
                 return f"ZIP file not found at path: {zip_file_path}", {"context_type": "full", "files_included": 0}
             
-            # Extract ZIP contents using repo_utils function
-            extracted_files, temp_extract_dir = extract_zip_contents(zip_file_path)
-            temp_dirs_to_cleanup.append(temp_extract_dir)
-            
-            if not extracted_files:
+            archive_key = (zip_file_path, zip_stat.st_ino, zip_stat.st_mtime_ns, zip_stat.st_size)
+            context_cache_key = (archive_key, model, max_context_tokens)
+            cached = get_cached_full_context(context_cache_key)
+            if cached is not None:
+                logger.info(f"Using cached full context for {zip_file_path}")
+                return cached
+            
+            # Source entries are cached per (zip path, mtime, size), so an unchanged
+            # repository is not re-read or re-extracted on every full-context turn
+            zip_entries = await asyncio.to_thread(read_zip_source_entries, zip_file_path)
+            if not zip_entries:
                 return "No files found in ZIP archive.", {"context_type": "full", "files_included": 0}
             
-            # Filter files to include only relevant source code files
-            filtered_files = smart_filter_files(extracted_files, temp_extract_dir)
+            # File contents only change with the archive, so their token counts are reused
+            token_counts = archive_token_counts((zip_file_path, zip_stat.st_mtime_ns, zip_stat.st_size))
+            
+            # Decoding and token estimation are CPU-bound, so the whole assembly runs
+            # in a worker thread instead of on the event loop
+            def assemble() -> tuple[str, int, int]:
+                context_parts = []
+                files_included = 0
+                current_tokens = 0
+            
+                # Sort files by importance (e.g., README files first, then main source files)
+                def get_file_priority(entry):
+                    file_path = entry[0].lower()
+                    if "readme" in file_path:
+                        return 0
+                    return FILE_PRIORITY_BY_EXTENSION.get(os.path.splitext(file_path)[1], 4)
+            
+                # Entries are ordered by path alone, so only files that fit in the
+                # token budget are ever decoded
+                def prioritized_entries():
+                    # Usually only the first few hundred files fit, so select those in
+                    # O(n log k) and only fully sort if the budget outlasts them
+                    k_estimate = max(100, max_context_tokens // 500)
+                    if len(zip_entries) <= k_estimate:
+                        yield from sorted(zip_entries, key=get_file_priority)
+                        return
+                    yield from heapq.nsmallest(k_estimate, zip_entries, key=get_file_priority)
+                    # Both orderings are stable, so this continues exactly where nsmallest stopped
+                    yield from sorted(zip_entries, key=get_file_priority)[k_estimate:]
+            
+                def add_truncated_section(section_header: str, header_tokens: int, content_prefix: str) -> None:
+                    nonlocal files_included, current_tokens
+                    truncated_content = content_prefix + "\n... (truncated due to token limit)"
+                    context_parts.extend((section_header, truncated_content, "\n"))
+                    files_included += 1
+                    current_tokens += estimate_section_tokens(truncated_content) + header_tokens
             
-            if not filtered_files:
-                return "No relevant source files found after filtering.", {"context_type": "full", "files_included": 0}
-            
-            # Use intelligent token counting with LangChain
-            from utils.langchain_llm_service import langchain_service
-            
-            context_parts = []
-            files_included = 0
-            current_tokens = 0
-            
-            # Sort files by importance (e.g., README files first, then main source files)
-            def get_file_priority(file_info):
-                file_path = file_info["path"].lower()
-                if "readme" in file_path:
-                    return 0
-                elif file_path.endswith(('.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs')):
-                    return 1
-                elif file_path.endswith(('.json', '.yaml', '.yml', '.xml')):
-                    return 2
-                elif file_path.endswith(('.md', '.txt', '.rst')):
-                    return 3
-                else:
-                    return 4
-            
-            sorted_files = sorted(filtered_files, key=get_file_priority)
-            
-            # Process files until we hit the token limit
-            for file_info in sorted_files:
-                try:
-                    file_path = file_info["path"]
-                    full_path = file_info["full_path"]
-                    
-                    # Read file content
+                # Process files until we hit the token limit
+                for file_path, data in prioritized_entries():
                     try:
-                        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                    except UnicodeDecodeError:
-                        # Try with different encoding for binary files
-                        with open(full_path, 'r', encoding='latin-1') as f:
-                            content = f.read()
+                        # Header and body are kept as separate parts so the (possibly large)
+                        # content is only copied once, by the final join
+                        section_header = f"\n=== File: {file_path} ===\n"
+                        header_tokens = estimate_section_tokens(section_header) + 1
+                        remaining_tokens = max_context_tokens - current_tokens
                     
-                    # Create file section
-                    file_section = f"\n=== File: {file_path} ===\n{content}\n"
+                        # A file that clearly cannot fit whole (by its cached count, or by raw
+                        # size) only has the prefix that could be used decoded. Notebooks
+                        # need the full JSON to extract cells, so they take the normal path.
+                        known_tokens = token_counts.get(file_path)
+                        if (
+                            context_parts
+                            and not file_path.lower().endswith(".ipynb")
+                            and (
+                                (known_tokens is not None and known_tokens > remaining_tokens)
+                                or len(data) > remaining_tokens * SECTION_CHARS_PER_TOKEN * 4
+                            )
+                        ):
+                            if remaining_tokens > 100:  # Only include if we have reasonable space
+                                max_content_chars = int(remaining_tokens * SECTION_CHARS_PER_TOKEN * 0.8)  # Use 80% to be safe
+                                if max_content_chars > 200:  # Minimum reasonable content size
+                                    # UTF-8 never has fewer bytes than characters, so this prefix is enough
+                                    prefix_info = zip_entry_to_file_info(file_path, data[:max_content_chars-100])
+                                    if prefix_info is not None:
+                                        add_truncated_section(section_header, header_tokens, prefix_info["content"])
+                            break
                     
-                    # Check if adding this file would exceed token limit
-                    file_section_tokens = langchain_service.count_tokens_approximately(file_section)
+                        file_info = zip_entry_to_file_info(file_path, data)
+                        if file_info is None:
+                            continue
+                        content = file_info["content"]
+                        section_length = len(section_header) + len(content) + 1
                     
-                    if current_tokens + file_section_tokens > max_context_tokens and context_parts:
-                        # Calculate how much content we can fit in remaining tokens
-                        remaining_tokens = max_context_tokens - current_tokens
-                        if remaining_tokens > 100:  # Only include if we have reasonable space
-                            # Estimate how much content we can fit
-                            approx_chars_per_token = len(file_section) / file_section_tokens
-                            max_content_chars = int(remaining_tokens * approx_chars_per_token * 0.8)  # Use 80% to be safe
-                            
-                            if max_content_chars > 200:  # Minimum reasonable content size
-                                truncated_content = content[:max_content_chars-100] + "\n... (truncated due to token limit)"
-                                file_section = f"\n=== File: {file_path} ===\n{truncated_content}\n"
-                                context_parts.append(file_section)
-                                files_included += 1
-                                current_tokens += langchain_service.count_tokens_approximately(file_section)
-                        break
+                        # Check if adding this file would exceed token limit
+                        file_section_tokens = known_tokens
+                        if file_section_tokens is None:
+                            file_section_tokens = estimate_section_tokens(content) + header_tokens
+                            token_counts[file_path] = file_section_tokens
                     
-                    context_parts.append(file_section)
-                    files_included += 1
-                    current_tokens += file_section_tokens
-                    
-                except Exception as e:
-                    logger.warning(f"Could not read file {file_path}: {e}")
-                    # Add a placeholder for files that couldn't be read
-                    file_section = f"\n=== File: {file_path} ===\n[Could not read file: {e}]\n"
-                    file_section_tokens = langchain_service.count_tokens_approximately(file_section)
+                        if current_tokens + file_section_tokens > max_context_tokens and context_parts:
+                            # Calculate how much content we can fit in remaining tokens
+                            if remaining_tokens > 100:  # Only include if we have reasonable space
+                                # Estimate how much content we can fit
+                                approx_chars_per_token = section_length / file_section_tokens
+                                max_content_chars = int(remaining_tokens * approx_chars_per_token * 0.8)  # Use 80% to be safe
+                            
+                                if max_content_chars > 200:  # Minimum reasonable content size
+                                    add_truncated_section(section_header, header_tokens, content[:max_content_chars-100])
+                            break
                     
-                    if current_tokens + file_section_tokens <= max_context_tokens:
-                        context_parts.append(file_section)
+                        context_parts.extend((section_header, content, "\n"))
                         files_included += 1
                         current_tokens += file_section_tokens
-                    continue
+                    
+                    except Exception as e:
+                        logger.warning(f"Could not read file {file_path}: {e}")
+                        # Add a placeholder for files that couldn't be read
+                        file_section = f"\n=== File: {file_path} ===\n[Could not read file: {e}]\n"
+                        file_section_tokens = estimate_section_tokens(file_section)
+                    
+                        if current_tokens + file_section_tokens <= max_context_tokens:
+                            context_parts.append(file_section)
+                            files_included += 1
+                            current_tokens += file_section_tokens
+                        continue
+            
+                return "".join(context_parts), files_included, current_tokens
             
-            context = "".join(context_parts)
+            context, files_included, current_tokens = await asyncio.to_thread(assemble)
             if not context:
                 context = "No file content could be extracted from the repository."
             
-            # Get final accurate token count
-            final_tokens = langchain_service.count_tokens_approximately(context)
+            # The per-section estimates already sum to the context's size; a full
+            # re-count over the joined context is only done when verification is enabled
+            final_tokens = current_tokens
+            if CONFIG["verify_context_tokens"]:
+                final_tokens = langchain_service.count_tokens_approximately(context)
+                if abs(final_tokens - current_tokens) > max(64, current_tokens // 20):
+                    logger.warning(f"Full context token estimate drifted: estimated {current_tokens}, counted {final_tokens}")
             
             metadata = {
                 "context_type": "full",
                 "files_included": files_included,
-                "total_files_available": len(filtered_files),
+                "total_files_available": len(zip_entries),
                 "actual_tokens": final_tokens,
                 "max_context_tokens": max_context_tokens,
                 "content_length": len(context),
@@ -1396,15 +1717,13 @@ Provide detailed, accurate responses based on the repository content. Reference
             }
             
             logger.info(f"Full context extracted: {files_included} files, {len(context)} characters, {final_tokens} tokens")
+            if files_included:
+                cache_full_context(context_cache_key, context, metadata)
             return context, metadata
             
         except Exception as e:
             logger.error(f"Error getting full repository context: {e}")
             return f"Error loading repository context: {str(e)}", {"context_type": "full", "error": str(e)}
-        finally:
-            # Clean up temporary directories
-            if temp_dirs_to_cleanup:
-                cleanup_temp_files(temp_dirs_to_cleanup)
 
 
 # Global instance
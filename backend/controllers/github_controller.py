@@ -1,8 +1,16 @@
+import asyncio
 import httpx
 import logging
+import time
+from datetime import datetime
+from operator import itemgetter
+from typing import Any, Callable, Optional
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter
 from beanie import PydanticObjectId
 from models.user import User
+from utils.http_client import get_http_client
+from utils.json_utils import json_loads
 from schemas.github_schemas import (
     GitHubInstallationsResponse,
     GitHubRepositoriesResponse,
@@ -14,6 +22,16 @@ from schemas.github_schemas import (
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Parsed GitHub App private keys, keyed by the raw configured value
+_github_private_key_cache: dict[str, Any] = {}
+# installation_id -> (installation access token, expiry as epoch seconds)
+_installation_token_cache: dict[int, tuple[str, float]] = {}
+INSTALLATION_TOKEN_REFRESH_MARGIN_SECONDS = 60
+GITHUB_PER_PAGE = 100
+# Pages fetched at once after the first; GitHub's secondary rate limit punishes bursts
+GITHUB_PAGE_CONCURRENCY = 4
+_repository_list_adapter = TypeAdapter(list[GitHubRepository])
+
 
 async def get_user_installations(user_id: str) -> GitHubInstallationsResponse:
     """
@@ -87,95 +105,95 @@ async def get_user_installations(user_id: str) -> GitHubInstallationsResponse:
         print(f"[PROD DEBUG] - Token prefix: {access_token[:4]}")
         print(f"[PROD DEBUG] - Headers: {dict(headers)}")
 
-        async with httpx.AsyncClient() as client:
-            # Get the current authenticated user's information
-            print("Fetching GitHub user information")
-            user_res = await client.get("https://api.github.com/user", headers=headers)
+        client = get_http_client()
+        # Get the current authenticated user's information
+        print("Fetching GitHub user information")
+        user_res = await client.get("https://api.github.com/user", headers=headers)
+        
+        print(f"[PROD DEBUG] GitHub API Response - Status: {user_res.status_code}")
+        
+        if user_res.status_code != 200:
+            error_data = json_loads(user_res.content) if user_res.content else {}
+            error_message = error_data.get("message", "Unknown error")
             
-            print(f"[PROD DEBUG] GitHub API Response - Status: {user_res.status_code}")
+            print("[PROD DEBUG] GitHub API Error Details")
+            print(f"[PROD DEBUG] - Status code: {user_res.status_code}")
+            print(f"[PROD DEBUG] - Error message: {error_message}")
+            print(f"[PROD DEBUG] - Full response: {error_data}")
+            print(f"[PROD DEBUG] - Request URL: {user_res.request.url}")
+            print(f"[PROD DEBUG] - Request method: {user_res.request.method}")
+            print(f"[PROD DEBUG] - Request headers: {dict(user_res.request.headers)}")
             
-            if user_res.status_code != 200:
-                error_data = user_res.json() if user_res.content else {}
-                error_message = error_data.get("message", "Unknown error")
-                
-                print("[PROD DEBUG] GitHub API Error Details")
-                print(f"[PROD DEBUG] - Status code: {user_res.status_code}")
-                print(f"[PROD DEBUG] - Error message: {error_message}")
-                print(f"[PROD DEBUG] - Full response: {error_data}")
-                print(f"[PROD DEBUG] - Request URL: {user_res.request.url}")
-                print(f"[PROD DEBUG] - Request method: {user_res.request.method}")
-                print(f"[PROD DEBUG] - Request headers: {dict(user_res.request.headers)}")
-                
-                if 'X-RateLimit-Remaining' in user_res.headers:
-                    print("[PROD DEBUG] Rate Limits")
-                    print(f"[PROD DEBUG] - Remaining: {user_res.headers.get('X-RateLimit-Remaining')}")
-                    print(f"[PROD DEBUG] - Reset at: {user_res.headers.get('X-RateLimit-Reset')}")
-                
-                # Check specific error cases
-                if error_message == "Bad credentials":
-                    print("[PROD DEBUG] Token validation failed - token might be expired or invalid")
+            if 'X-RateLimit-Remaining' in user_res.headers:
+                print("[PROD DEBUG] Rate Limits")
+                print(f"[PROD DEBUG] - Remaining: {user_res.headers.get('X-RateLimit-Remaining')}")
+                print(f"[PROD DEBUG] - Reset at: {user_res.headers.get('X-RateLimit-Reset')}")
+            
+            # Check specific error cases
+            if error_message == "Bad credentials":
+                print("[PROD DEBUG] Token validation failed - token might be expired or invalid")
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="GitHub token is invalid or expired. Please re-authenticate."
+                )
+            elif user_res.status_code == 403:
+                if "rate limit" in error_message.lower():
+                    print("[PROD DEBUG] Rate limit exceeded")
                     raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="GitHub token is invalid or expired. Please re-authenticate."
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail="GitHub API rate limit exceeded. Please try again later."
                     )
-                elif user_res.status_code == 403:
-                    if "rate limit" in error_message.lower():
-                        print("[PROD DEBUG] Rate limit exceeded")
-                        raise HTTPException(
-                            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                            detail="GitHub API rate limit exceeded. Please try again later."
-                        )
-                    else:
-                        print("[PROD DEBUG] Permission issue detected")
-                        raise HTTPException(
-                            status_code=status.HTTP_403_FORBIDDEN,
-                            detail=f"GitHub API access forbidden: {error_message}"
-                        )
                 else:
+                    print("[PROD DEBUG] Permission issue detected")
                     raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail=f"Invalid GitHub token: {error_message}"
+                        status_code=status.HTTP_403_FORBIDDEN,
+                        detail=f"GitHub API access forbidden: {error_message}"
                     )
-
-            github_user = user_res.json()
-
-            # Get user installations
-            print("Fetching GitHub user installations")
-            installations_res = await client.get(
-                "https://api.github.com/user/installations", 
-                headers=headers
-            )
-            
-            if installations_res.status_code != 200:
-                error_data = installations_res.json() if installations_res.content else {}
-                error_message = error_data.get("message", "Unknown error")
-                print(f"GitHub installations API failed with status {installations_res.status_code}: {error_message}")
-                print(f"GitHub API Response: {error_data}")
-                print(f"Request headers: {headers}")
+            else:
                 raise HTTPException(
-                    status_code=installations_res.status_code,
-                    detail=f"Failed to fetch installations: {installations_res.status_code}: {error_message}"
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail=f"Invalid GitHub token: {error_message}"
                 )
 
-            installations_data = installations_res.json()
-
-            # Filter installations to only include those where the app is installed on the user's account
-            user_installations = []
-            for installation in installations_data.get("installations", []):
-                # Check if the installation is on the user's personal account
-                if installation["account"]["id"] == github_user["id"]:
-                    user_installations.append(GitHubInstallation(**installation))
-                # Include organization installations
-                elif installation.get("target_type") == "Organization":
-                    user_installations.append(GitHubInstallation(**installation))
-
-            response = GitHubInstallationsResponse(
-                installations=user_installations,
-                user_id=github_user["id"],
-                user_login=github_user["login"]
+        github_user = json_loads(user_res.content)
+
+        # Get user installations
+        print("Fetching GitHub user installations")
+        installations_res = await client.get(
+            "https://api.github.com/user/installations", 
+            headers=headers
+        )
+        
+        if installations_res.status_code != 200:
+            error_data = json_loads(installations_res.content) if installations_res.content else {}
+            error_message = error_data.get("message", "Unknown error")
+            print(f"GitHub installations API failed with status {installations_res.status_code}: {error_message}")
+            print(f"GitHub API Response: {error_data}")
+            print(f"Request headers: {headers}")
+            raise HTTPException(
+                status_code=installations_res.status_code,
+                detail=f"Failed to fetch installations: {installations_res.status_code}: {error_message}"
             )
-            print(f"Successfully fetched {len(user_installations)} GitHub installations for user {github_user['login']}")
-            return response
+
+        installations_data = json_loads(installations_res.content)
+
+        # Filter installations to only include those where the app is installed on the user's account
+        user_installations = []
+        for installation in installations_data.get("installations", []):
+            # Check if the installation is on the user's personal account
+            if installation["account"]["id"] == github_user["id"]:
+                user_installations.append(GitHubInstallation(**installation))
+            # Include organization installations
+            elif installation.get("target_type") == "Organization":
+                user_installations.append(GitHubInstallation(**installation))
+
+        response = GitHubInstallationsResponse(
+            installations=user_installations,
+            user_id=github_user["id"],
+            user_login=github_user["login"]
+        )
+        print(f"Successfully fetched {len(user_installations)} GitHub installations for user {github_user['login']}")
+        return response
 
     except HTTPException:
         raise
@@ -187,6 +205,183 @@ async def get_user_installations(user_id: str) -> GitHubInstallationsResponse:
         )
 
 
+def _load_github_private_key(github_private_key: str) -> Any:
+    """Parse the GitHub App PEM private key, once per distinct configured value"""
+    cached_key = _github_private_key_cache.get(github_private_key)
+    if cached_key is not None:
+        return cached_key
+
+    from cryptography.hazmat.primitives import serialization
+
+    try:
+        # Handle different private key formats
+        if github_private_key.startswith('"') and github_private_key.endswith('"'):
+            # Remove quotes if present
+            private_key_content = github_private_key[1:-1]
+        else:
+            private_key_content = github_private_key
+        
+        # Replace escaped newlines with actual newlines
+        private_key_formatted = private_key_content.replace('\\n', '\n')
+        
+        # Ensure proper PEM format
+        if not private_key_formatted.startswith('-----BEGIN'):
+            raise ValueError("Private key must start with -----BEGIN")
+        
+        private_key = serialization.load_pem_private_key(
+            private_key_formatted.encode('utf-8'),
+            password=None
+        )
+        print("[DEBUG] Successfully parsed private key")
+    except Exception as e:
+        print(f"[DEBUG] Private key parsing error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to parse GitHub private key: {str(e)}"
+        )
+
+    _github_private_key_cache[github_private_key] = private_key
+    return private_key
+
+
+async def _get_installation_token(
+    client: httpx.AsyncClient,
+    installation_id: int,
+    github_app_id: str,
+    github_private_key: str
+) -> str:
+    """Return an installation access token, reusing a cached one until shortly before it expires"""
+    cached_token = _installation_token_cache.get(installation_id)
+    if cached_token and cached_token[1] - INSTALLATION_TOKEN_REFRESH_MARGIN_SECONDS > time.time():
+        return cached_token[0]
+
+    from jose import jwt
+
+    private_key = _load_github_private_key(github_private_key)
+
+    # Create JWT for GitHub App authentication
+    now = int(time.time())
+    payload = {
+        'iat': now - 60,  # 1 minute ago to account for clock skew
+        'exp': now + 600,  # 10 minutes from now (GitHub allows max 10 minutes)
+        'iss': github_app_id  # Keep as string, GitHub accepts both
+    }
+    
+    try:
+        # Use RS256 algorithm as required by GitHub
+        jwt_token = jwt.encode(payload, private_key, algorithm='RS256')
+        print(f"[DEBUG] Created JWT for GitHub App {github_app_id}, installation {installation_id}")
+        print(f"[DEBUG] JWT payload: {payload}")
+        print(f"[DEBUG] JWT token (first 50 chars): {jwt_token[:50]}")
+    except Exception as e:
+        print(f"[DEBUG] JWT creation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create GitHub App JWT: {str(e)}"
+        )
+
+    # Get installation token
+    installation_token_res = await client.post(
+        f"https://api.github.com/app/installations/{installation_id}/access_tokens",
+        headers={
+            "Authorization": f"Bearer {jwt_token}",
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "GitVizz-Backend/1.0",
+        }
+    )
+
+    if installation_token_res.status_code != 201:
+        error_detail = "Failed to get installation token"
+        try:
+            error_response = json_loads(installation_token_res.content)
+            error_detail = f"GitHub API Error: {error_response.get('message', 'Unknown error')}"
+            print(f"[DEBUG] GitHub API error response: {error_response}")
+        except Exception:
+            error_detail = f"GitHub API HTTP Error: {installation_token_res.status_code}"
+            print(f"[DEBUG] Raw response text: {installation_token_res.text}")
+        
+        print(f"[DEBUG] Installation token request failed with status {installation_token_res.status_code}")
+        print(f"[DEBUG] Request URL: https://api.github.com/app/installations/{installation_id}/access_tokens")
+        
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error_detail
+        )
+
+    token_data = json_loads(installation_token_res.content)
+    installation_token = token_data["token"]
+    # GitHub installation tokens last an hour; prefer the expiry GitHub reports
+    try:
+        expires_at = datetime.fromisoformat(token_data["expires_at"].replace("Z", "+00:00")).timestamp()
+    except (KeyError, AttributeError, ValueError):
+        expires_at = time.time() + 3600
+    _installation_token_cache[installation_id] = (installation_token, expires_at)
+    return installation_token
+
+
+async def _fetch_all_pages(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict,
+    items_key: Optional[str] = None,
+    per_page: int = GITHUB_PER_PAGE,
+    on_unauthorized: Optional[Callable[[], Any]] = None,
+    select: Optional[Callable[[dict], Any]] = None
+) -> list:
+    """Fetch every page of a paginated GitHub list endpoint.
+
+    The first page's Link header tells how many pages there are; the rest are
+    then requested a few at a time. Without a "last" link, pages are walked one
+    by one until a short page. A failed first page yields an empty list, as
+    before, but a failed later page raises a 502 rather than returning a
+    listing with gaps. With `select`, only the selected value of each item is
+    kept instead of the full dict.
+    """
+    def page_items(res: httpx.Response, page: int) -> list:
+        if res.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"GitHub returned {res.status_code} for page {page} of {url}"
+            )
+        data = json_loads(res.content)
+        items = data.get(items_key, []) if items_key else data
+        return [select(item) for item in items] if select else items
+
+    first_res = await client.get(url, headers=headers, params={"per_page": per_page, "page": 1})
+    if first_res.status_code != 200:
+        if first_res.status_code == 401 and on_unauthorized:
+            # Cached token was revoked; mint a fresh one next time
+            on_unauthorized()
+        return []
+
+    items = list(page_items(first_res, 1))
+    last_url = first_res.links.get("last", {}).get("url")
+    if last_url:
+        last_page = int(httpx.URL(last_url).params.get("page", 1))
+        semaphore = asyncio.Semaphore(GITHUB_PAGE_CONCURRENCY)
+
+        async def fetch_page(page: int) -> list:
+            async with semaphore:
+                res = await client.get(url, headers=headers, params={"per_page": per_page, "page": page})
+            return page_items(res, page)
+
+        for page_data in await asyncio.gather(*[
+            fetch_page(page) for page in range(2, last_page + 1)
+        ]):
+            items.extend(page_data)
+        return items
+
+    page = 1
+    last_count = len(items)
+    while last_count == per_page:
+        page += 1
+        res = await client.get(url, headers=headers, params={"per_page": per_page, "page": page})
+        page_data = page_items(res, page)
+        items.extend(page_data)
+        last_count = len(page_data)
+    return items
+
+
 async def get_installation_repositories(
     installation_id: int, 
     user_id: str
@@ -216,189 +411,56 @@ async def get_installation_repositories(
                 detail="GitHub App credentials not configured"
             )
 
-        # Create GitHub App authentication for installation access
-        from cryptography.hazmat.primitives import serialization
-        from jose import jwt
-        import time
-
-        # Parse the private key
-        try:
-            # Handle different private key formats
-            if github_private_key.startswith('"') and github_private_key.endswith('"'):
-                # Remove quotes if present
-                private_key_content = github_private_key[1:-1]
-            else:
-                private_key_content = github_private_key
-            
-            # Replace escaped newlines with actual newlines
-            private_key_formatted = private_key_content.replace('\\n', '\n')
-            
-            # Ensure proper PEM format
-            if not private_key_formatted.startswith('-----BEGIN'):
-                raise ValueError("Private key must start with -----BEGIN")
-            
-            private_key = serialization.load_pem_private_key(
-                private_key_formatted.encode('utf-8'),
-                password=None
-            )
-            print("[DEBUG] Successfully parsed private key")
-        except Exception as e:
-            print(f"[DEBUG] Private key parsing error: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to parse GitHub private key: {str(e)}"
-            )
-
-        # Create JWT for GitHub App authentication
-        now = int(time.time())
-        payload = {
-            'iat': now - 60,  # 1 minute ago to account for clock skew
-            'exp': now + 600,  # 10 minutes from now (GitHub allows max 10 minutes)
-            'iss': github_app_id  # Keep as string, GitHub accepts both
-        }
-        
-        try:
-            # Use RS256 algorithm as required by GitHub
-            jwt_token = jwt.encode(payload, private_key, algorithm='RS256')
-            print(f"[DEBUG] Created JWT for GitHub App {github_app_id}, installation {installation_id}")
-            print(f"[DEBUG] JWT payload: {payload}")
-            print(f"[DEBUG] JWT token (first 50 chars): {jwt_token[:50]}")
-        except Exception as e:
-            print(f"[DEBUG] JWT creation error: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to create GitHub App JWT: {str(e)}"
-            )
+        client = get_http_client()
+        installation_token = await _get_installation_token(
+            client, installation_id, github_app_id, github_private_key
+        )
 
-        async with httpx.AsyncClient() as client:
-            # Get installation token
-            installation_token_res = await client.post(
-                f"https://api.github.com/app/installations/{installation_id}/access_tokens",
+        # Installation and user repositories are independent, so walk both at once
+        installation_repositories, user_repo_ids = await asyncio.gather(
+            _fetch_all_pages(
+                client,
+                "https://api.github.com/installation/repositories",
                 headers={
-                    "Authorization": f"Bearer {jwt_token}",
+                    "Authorization": f"token {installation_token}",
                     "Accept": "application/vnd.github+json",
-                    "User-Agent": "GitVizz-Backend/1.0",
-                }
-            )
-
-            if installation_token_res.status_code != 201:
-                error_detail = "Failed to get installation token"
-                try:
-                    error_response = installation_token_res.json()
-                    error_detail = f"GitHub API Error: {error_response.get('message', 'Unknown error')}"
-                    print(f"[DEBUG] GitHub API error response: {error_response}")
-                except Exception:
-                    error_detail = f"GitHub API HTTP Error: {installation_token_res.status_code}"
-                    print(f"[DEBUG] Raw response text: {installation_token_res.text}")
-                
-                print(f"[DEBUG] Installation token request failed with status {installation_token_res.status_code}")
-                print(f"[DEBUG] Request URL: https://api.github.com/app/installations/{installation_id}/access_tokens")
-                
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=error_detail
-                )
-
-            installation_token = installation_token_res.json()["token"]
-
-            # Fetch installation repositories (all repositories accessible to the GitHub App)
-            installation_repositories = []
-            page = 1
-            per_page = 100
-
-            while True:
-                repos_res = await client.get(
-                    "https://api.github.com/installation/repositories",
-                    headers={
-                        "Authorization": f"token {installation_token}",
-                        "Accept": "application/vnd.github+json",
-                    },
-                    params={"per_page": per_page, "page": page}
-                )
-
-                if repos_res.status_code != 200:
-                    break
-
-                repos_data = repos_res.json()
-                repositories = repos_data.get("repositories", [])
-                
-                if not repositories:
-                    break
-
-                installation_repositories.extend(repositories)
-                
-                # Check if there are more pages
-                if len(repositories) < per_page:
-                    break
-                    
-                page += 1
-
-            # Fetch user repositories (repositories the authenticated user has access to)
-            user_repositories = []
-            page = 1
-
-            while True:
-                user_repos_res = await client.get(
-                    "https://api.github.com/user/repos",
-                    headers={
-                        "Authorization": f"Bearer {user.github_access_token}",
-                        "Accept": "application/vnd.github+json",
-                    },
-                    params={"per_page": per_page, "page": page}
-                )
-
-                if user_repos_res.status_code != 200:
-                    break
-
-                repositories = user_repos_res.json()
-                
-                if not repositories:
-                    break
-
-                user_repositories.extend(repositories)
-                
-                # Check if there are more pages
-                if len(repositories) < per_page:
-                    break
-                    
-                page += 1
+                },
+                items_key="repositories",
+                on_unauthorized=lambda: _installation_token_cache.pop(installation_id, None),
+            ),
+            _fetch_all_pages(
+                client,
+                "https://api.github.com/user/repos",
+                headers={
+                    "Authorization": f"Bearer {user.github_access_token}",
+                    "Accept": "application/vnd.github+json",
+                },
+                # Only ids are needed to intersect, so don't keep full repo dicts
+                select=itemgetter("id"),
+            ),
+        )
 
-            # Filter repositories: only return installation repositories that the user has access to
-            user_repo_ids = {repo["id"] for repo in user_repositories}
-            
-            filtered_repositories = [
-                repo for repo in installation_repositories 
-                if repo["id"] in user_repo_ids
-            ]
-
-            # Sort repositories by updated_at in descending order (most recent first)
-            filtered_repositories.sort(
-                key=lambda x: x.get("updated_at", ""), 
-                reverse=True
-            )
+        # Filter repositories: only return installation repositories that the user has access to
+        user_repo_ids = set(user_repo_ids)
+        
+        filtered_repositories = [
+            repo for repo in installation_repositories 
+            if repo["id"] in user_repo_ids
+        ]
+
+        # Sort repositories by updated_at in descending order (most recent first)
+        filtered_repositories.sort(
+            key=lambda x: x.get("updated_at", ""), 
+            reverse=True
+        )
 
-            # Convert to schema objects
-            github_repos = []
-            for repo in filtered_repositories:
-                github_repo = GitHubRepository(
-                    id=repo["id"],
-                    name=repo["name"],
-                    full_name=repo["full_name"],
-                    description=repo.get("description"),  # Allow None, frontend will handle fallback
-                    private=repo["private"],
-                    html_url=repo["html_url"],
-                    language=repo.get("language"),
-                    stargazers_count=repo.get("stargazers_count", 0),
-                    forks_count=repo.get("forks_count", 0),
-                    default_branch=repo.get("default_branch", "main"),
-                    updated_at=repo.get("updated_at")
-                )
-                github_repos.append(github_repo)
+        # Convert to schema objects in one validation pass; extra GitHub fields are ignored
+        github_repos = _repository_list_adapter.validate_python(filtered_repositories)
 
-            return GitHubRepositoriesResponse(
-                repositories=github_repos,
-                total_count=len(github_repos)
-            )
+        return GitHubRepositoriesResponse(
+            repositories=github_repos,
+            total_count=len(github_repos)
+        )
 
     except HTTPException:
         raise
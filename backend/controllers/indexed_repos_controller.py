@@ -1,10 +1,22 @@
 from fastapi import HTTPException
+import asyncio
 import os
+from typing import Optional
 from models.repository import Repository
 from models.user import User
 from schemas.response_schemas import IndexedRepository, IndexedRepositoriesResponse
 
 
+def _safe_stat_size(path: Optional[str]) -> Optional[int]:
+    """Return the file size in bytes, or None if the path is unset or unreadable"""
+    if not path:
+        return None
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
+
+
 async def get_user_indexed_repositories(
     user: User,
     limit: int = 50,
@@ -16,33 +28,38 @@ async def get_user_indexed_repositories(
     """
 
     try:
-        # Query repositories for the current user with pagination
-        repositories = (
-            await Repository.find(Repository.user.id == user.id)
-            .sort(-Repository.created_at)
-            .skip(offset)
-            .limit(limit)
-            .to_list()
-        )
+        # Fetch the page and the total count in a single round-trip
+        facet_results = await Repository.find(Repository.user.id == user.id).aggregate([
+            {
+                "$facet": {
+                    "page": [
+                        {"$sort": {"created_at": -1}},
+                        {"$skip": offset},
+                        {"$limit": limit},
+                    ],
+                    "total": [{"$count": "n"}],
+                }
+            }
+        ]).to_list()
+        facet = facet_results[0] if facet_results else {}
+        repositories = [Repository.model_validate(doc) for doc in facet.get("page", [])]
+        total = facet.get("total", [])
+        total_count = total[0]["n"] if total else 0
 
-        # Get total count for pagination info
-        total_count = await Repository.find(
-            Repository.user.id == user.id
-        ).count()
+        # Stat every ZIP off the event loop at once
+        file_sizes = await asyncio.gather(
+            *[asyncio.to_thread(_safe_stat_size, repo.file_paths.zip) for repo in repositories]
+        )
 
         # Transform to response format
         indexed_repos = []
-        for repo in repositories:
+        for repo, file_size_bytes in zip(repositories, file_sizes):
             # Calculate file size if zip file exists
             file_size_mb = None
-            if repo.file_paths.zip and os.path.exists(repo.file_paths.zip):
-                try:
-                    file_size_bytes = os.path.getsize(repo.file_paths.zip)
-                    file_size_mb = round(
-                        file_size_bytes / (1024 * 1024), 2
-                    )  # Convert to MB
-                except OSError:
-                    file_size_mb = None
+            if file_size_bytes is not None:
+                file_size_mb = round(
+                    file_size_bytes / (1024 * 1024), 2
+                )  # Convert to MB
 
             indexed_repo = IndexedRepository(
                 repo_id=str(repo.id),
@@ -34,9 +34,14 @@ class Conversation(Document):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
     total_tokens_used: int = 0
+    cached_tokens_used: int = 0  # Prompt tokens served from the provider's prompt cache
     
     class Settings:
         name = "conversations"
+        indexes = [
+            [("chat_id", 1), ("user.$id", 1), ("updated_at", -1)],  # Conversations in a chat, newest first
+            [("conversation_id", 1), ("user.$id", 1)],  # Single conversation lookup
+        ]
         
     def add_message(self, role: str, content: str, context_used: Optional[str] = None, metadata: Optional[Dict] = None):
         """Add a message to the conversation"""
@@ -50,6 +55,13 @@ class Conversation(Document):
         self.updated_at = datetime.utcnow()
         return message
 
+    def record_usage(self, usage: Optional[Dict[str, Any]]):
+        """Accumulate token usage, tracking prompt-cache hits separately"""
+        if not usage:
+            return
+        self.total_tokens_used += usage.get("total_tokens", 0) or 0
+        self.cached_tokens_used += usage.get("cached_tokens", 0) or 0
+
 class ChatSession(Document):
     """Chat session that groups multiple conversations"""
     user: Link[User]
@@ -69,6 +81,10 @@ class ChatSession(Document):
     # Rate limiting tracking
     daily_requests_count: int = 0
     last_request_date: datetime = Field(default_factory=datetime.utcnow)
+    # Token usage for the current day, reset together with the request count
+    daily_tokens_used: int = 0
+    daily_cached_tokens: int = 0
+    daily_billable_tokens: float = 0
     
     # Metadata
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -77,12 +93,20 @@ class ChatSession(Document):
     
     class Settings:
         name = "chat_sessions"
+        indexes = [
+            # User's active sessions for a repository, newest first
+            [("user.$id", 1), ("repository.$id", 1), ("is_active", 1), ("updated_at", -1)],
+            "chat_id",  # Session lookup by chat_id
+        ]
         
     def reset_daily_count_if_needed(self):
         """Reset daily request count if it's a new day"""
         today = datetime.utcnow().date()
         if self.last_request_date.date() != today:
             self.daily_requests_count = 0
+            self.daily_tokens_used = 0
+            self.daily_cached_tokens = 0
+            self.daily_billable_tokens = 0
             self.last_request_date = datetime.utcnow()
             
     def can_make_request(self, daily_limit: int = 50) -> bool:
@@ -95,7 +119,29 @@ class ChatSession(Document):
         self.reset_daily_count_if_needed()
         self.daily_requests_count += 1
         self.updated_at = datetime.utcnow()
+
+    def record_daily_usage(self, usage: Optional[Dict[str, Any]]):
+        """Add a response's token usage (with billable tokens) to today's counters"""
+        self.reset_daily_count_if_needed()
+        if not usage:
+            return
+        self.daily_tokens_used += usage.get("total_tokens", 0) or 0
+        self.daily_cached_tokens += usage.get("cached_tokens", 0) or 0
+        self.daily_billable_tokens += usage.get("billable_tokens", 0) or 0
         
+class ChatSessionSummary(BaseModel):
+    """Projection of ChatSession used for listings (skips settings and keys)"""
+    chat_id: str
+    title: Optional[str] = None
+
+
+class ConversationSummary(BaseModel):
+    """Projection of Conversation without the messages array"""
+    chat_id: str
+    conversation_id: str
+    updated_at: datetime
+
+
 class UserApiKey(Document):
     """Store user's API keys securely"""
     user: Link[User]
@@ -8,7 +8,7 @@ from schemas.chat_schemas import (
     ChatSessionResponse, ChatSettingsResponse,
     ContextSearchResponse, ChatSessionListResponse
 )
-from controllers.chat_controller import chat_controller
+from controllers.chat_controller import chat_controller, CHAT_STREAM_VERSION
 from schemas.response_schemas import ErrorResponse
 
 router = APIRouter(prefix="/backend-chat")
@@ -138,7 +138,8 @@ async def stream_chat_response(
             max_tokens=max_tokens,
             context_mode=context_mode,
         ),
-        media_type="application/x-ndjson"
+        media_type="application/x-ndjson",
+        headers={"X-Chat-Stream-Version": CHAT_STREAM_VERSION}
     )
 
 # Conversation history endpoint
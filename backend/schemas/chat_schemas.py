@@ -34,6 +34,8 @@ class TokenUsage(BaseModel):
     prompt_tokens: int = 0
     completion_tokens: int = 0
     total_tokens: int = 0
+    cached_tokens: int = 0  # Prompt tokens served from the provider's prompt cache
+    billable_tokens: Optional[float] = None  # Cached tokens counted at half price
 
 
 class DailyUsage(BaseModel):
@@ -41,6 +43,9 @@ class DailyUsage(BaseModel):
     requests_used: int
     requests_limit: int  # -1 for unlimited
     reset_date: str
+    tokens_used: int = 0
+    cached_tokens: int = 0
+    billable_tokens: float = 0
 
 
 # Message Models
@@ -61,13 +66,13 @@ class MessageResponse(BaseModel):
 # Streaming Models
 class StreamChatResponse(BaseModel):
     """Response model for streaming chat events"""
-    event: str = Field(..., description="Type of streaming event (token, complete, error, progress, reasoning)")
+    event: str = Field(..., description="Type of streaming event (start, token, complete, error, progress, reasoning)")
     token: Optional[str] = Field(None, description="Token content for 'token' events")
     error: Optional[str] = Field(None, description="Error message for 'error' events")
     error_type: Optional[str] = Field(None, description="Type of error for 'error' events")
     usage: Optional[Dict[str, Any]] = Field(None, description="Token usage for 'complete' events")
-    provider: Optional[str] = Field(None, description="Provider name for all events")
-    model: Optional[str] = Field(None, description="Model name for all events")
+    provider: Optional[str] = Field(None, description="Provider name for 'start', 'complete' and 'error' events")
+    model: Optional[str] = Field(None, description="Model name for 'start', 'complete' and 'error' events")
     chat_id: Optional[str] = Field(None, description="Chat session ID")
     conversation_id: Optional[str] = Field(None, description="Conversation thread ID")
     progress_step: Optional[str] = Field(None, description="Progress step for 'progress' events")
@@ -143,6 +148,7 @@ class ConversationHistoryResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     total_tokens_used: int = 0
+    cached_tokens_used: int = 0
     model_provider: ModelProvider
     model_name: str
 
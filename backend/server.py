@@ -10,6 +10,8 @@ from routes.api_key_routes import router as api_key_router
 from routes.github_routes import router as github_router
 from utils.observability import initialize_observability
 from utils.db import db_instance
+from utils.http_client import close_http_client
+from utils.graph_generation import shutdown_graph_workers
 
 import os
 from dotenv import load_dotenv
@@ -31,6 +33,8 @@ async def lifespan(app: FastAPI):
     yield  # Let the application run
 
     # Clean up resources if needed
+    await close_http_client()
+    shutdown_graph_workers()
     await db_instance.close_db()
 
 
@@ -0,0 +1,52 @@
+"""
+Tests for async_utils.py
+Covers prefetching of async generators
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.async_utils import prefetch
+
+
+async def _numbers(count, fail=False):
+    for i in range(count):
+        yield i
+    if fail:
+        raise ValueError("upstream failed")
+
+
+def test_prefetch_preserves_order_and_errors():
+    async def run():
+        assert [x async for x in prefetch(_numbers(5))] == [0, 1, 2, 3, 4]
+        with pytest.raises(ValueError):
+            [x async for x in prefetch(_numbers(2, fail=True))]
+
+    asyncio.run(run())
+
+
+def test_prefetch_closes_upstream_when_consumer_stops():
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            while True:
+                yield 1
+                await asyncio.sleep(0)
+        finally:
+            closed.set()
+
+    async def run():
+        stream = prefetch(endless())
+        async for _ in stream:
+            break
+        await stream.aclose()
+        assert closed.is_set()
+
+    asyncio.run(run())
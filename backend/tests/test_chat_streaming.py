@@ -0,0 +1,46 @@
+"""
+Tests for streaming helpers in chat_controller.py
+Covers token micro-batching of upstream NDJSON chunks
+"""
+
+import asyncio
+import os
+import sys
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from controllers.chat_controller import coalesce_token_events
+from utils.json_utils import ndjson_line
+
+
+async def _chunks(events, delay=0.0):
+    for event in events:
+        yield ndjson_line(event)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def _collect(chunks):
+    async def run():
+        return [event async for event in coalesce_token_events(chunks)]
+    return asyncio.run(run())
+
+
+def test_first_token_is_sent_alone_and_rest_are_merged():
+    events = [{"event": "token", "token": t, "chat_id": "c1"} for t in "abcd"]
+    events.append({"event": "complete", "usage": {"total_tokens": 4}})
+
+    result = _collect(_chunks(events))
+
+    assert [e.get("token") for e in result] == ["a", "bcd", None]
+    assert result[1]["chat_id"] == "c1"
+    assert result[2]["event"] == "complete"
+
+
+def test_pending_tokens_flush_when_upstream_is_quiet():
+    events = [{"event": "token", "token": t} for t in "abc"]
+
+    result = _collect(_chunks(events, delay=0.05))
+
+    assert [e["token"] for e in result] == ["a", "b", "c"]
@@ -0,0 +1,66 @@
+"""
+Tests for json_utils.py
+Covers NDJSON reassembly from split stream chunks, storage serialization and
+pre-encoded JSON responses
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from schemas.response_schemas import GraphResponse
+from utils.json_utils import (
+    NDJSONBuffer,
+    json_dumps_pretty,
+    model_json_response,
+    ndjson_bytes,
+    ndjson_line,
+)
+
+
+def test_ndjson_buffer_reassembles_split_and_batched_lines():
+    stream = ndjson_line({"event": "token", "token": "Hel"}) + ndjson_line({"event": "token", "token": "lo"})
+    buffer = NDJSONBuffer()
+
+    events = []
+    for chunk in (stream[:7], stream[7:30], stream[30:]):
+        events.extend(buffer.feed(chunk))
+    events.extend(buffer.flush())
+
+    assert [event["token"] for event in events] == ["Hel", "lo"]
+
+
+def test_ndjson_buffer_flushes_unterminated_line_and_skips_garbage():
+    buffer = NDJSONBuffer()
+
+    assert list(buffer.feed('not json\n\n{"event": "complete"}')) == []
+    assert list(buffer.flush()) == [{"event": "complete"}]
+    assert list(buffer.flush()) == []
+
+
+def test_ndjson_bytes_matches_line_encoding():
+    payload = {"event": "token", "token": "héllo"}
+
+    assert ndjson_bytes(payload) == ndjson_line(payload).encode()
+
+
+def test_json_dumps_pretty_matches_stdlib_default_str():
+    payload = {"created": datetime(2024, 1, 2, 3, 4, 5), "name": "héllo", "nodes": [1, 2]}
+
+    assert json.loads(json_dumps_pretty(payload)) == json.loads(json.dumps(payload, default=str))
+
+
+def test_model_json_response_uses_response_aliases():
+    graph = GraphResponse(
+        nodes=[{"id": "m", "name": "m", "category": "module", "start_line": 1, "parent_id": "x"}],
+        edges=[{"source": "m", "target": "n", "relationship": "calls"}],
+    )
+    response = model_json_response(graph)
+
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == graph.model_dump(mode="json", by_alias=True)
+    assert json.loads(response.body)["nodes"][0]["start_line"] == 1
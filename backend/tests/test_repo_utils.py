@@ -0,0 +1,157 @@
+"""
+Tests for repo_utils.py
+Covers ZIP source-entry reading, caching, and in-memory filtering
+"""
+
+import os
+import sys
+import zipfile
+
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.repo_utils import (
+    extract_zip_contents,
+    extract_source_entries,
+    smart_filter_files,
+    format_repo_contents,
+    format_repo_structure,
+    iter_format_repo_contents,
+    cleanup_temp_files,
+    read_zip_source_entries,
+    smart_filter_zip_entries,
+    zip_entry_cache,
+    ZipEntryCache,
+)
+
+
+@pytest.fixture
+def repo_zip(tmp_path):
+    zip_path = tmp_path / "repository.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("owner-repo-abc123/main.py", "import os\r\nprint(os.getcwd())\n")
+        zf.writestr("owner-repo-abc123/docs/README.md", "# Title\n")
+        zf.writestr("owner-repo-abc123/.github/workflow.yml", "on: push\n")
+        zf.writestr("owner-repo-abc123/logo.png", b"\x89PNG")
+        zf.writestr("owner-repo-abc123/empty.py", "")
+        zf.writestr(
+            "owner-repo-abc123/notebook.ipynb",
+            '{"cells": [{"cell_type": "code", "source": ["x = 1"]}]}',
+        )
+    return str(zip_path)
+
+
+def test_zip_entries_match_extracted_files(repo_zip):
+    """In-memory filtering produces the same text as extract + smart_filter_files"""
+    extracted_files, temp_dir = extract_zip_contents(repo_zip)
+    try:
+        expected = format_repo_contents(smart_filter_files(extracted_files, temp_dir))
+    finally:
+        cleanup_temp_files([temp_dir])
+
+    actual = format_repo_contents(smart_filter_zip_entries(read_zip_source_entries(repo_zip)))
+    assert actual == expected
+
+
+def test_source_entry_extraction_matches_full_extraction(repo_zip):
+    with zipfile.ZipFile(repo_zip, "a") as zf:
+        # Enough entries and bytes to take the thread-pool path
+        for i in range(40):
+            zf.writestr(f"owner-repo-abc123/pkg{i % 3}/mod_{i}.py", f"value = {i}\n" + "# pad\n" * 800)
+
+    results = []
+    for extract in (extract_zip_contents, extract_source_entries):
+        extracted_files, temp_dir = extract(repo_zip)
+        try:
+            results.append(format_repo_contents(smart_filter_files(extracted_files, temp_dir)))
+        finally:
+            cleanup_temp_files([temp_dir])
+
+    assert results[0] == results[1]
+
+
+def test_ignored_directories_are_never_extracted(repo_zip):
+    with zipfile.ZipFile(repo_zip, "a") as zf:
+        zf.writestr("owner-repo-abc123/node_modules/lib/index.js", "module.exports = 1;\n")
+        zf.writestr("owner-repo-abc123/src/__pycache__/notes.txt", "stale\n")
+        zf.writestr("owner-repo-abc123/src/node_modules.py", "x = 1\n")
+
+    extracted_files, temp_dir = extract_source_entries(repo_zip)
+    cleanup_temp_files([temp_dir])
+    paths = {f["path"] for f in extracted_files}
+
+    assert "owner-repo-abc123/src/node_modules.py" in paths
+    assert not any("node_modules/" in p or "__pycache__" in p for p in paths)
+    assert ".github" not in " ".join(paths)
+
+
+def test_identical_contents_share_one_string(tmp_path):
+    zip_path = tmp_path / "dupes.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("repo/a/vendor.js", "var x = 1;\n" * 10)
+        zf.writestr("repo/b/vendor.js", "var x = 1;\n" * 10)
+        zf.writestr("repo/c.js", "var y = 2;\n")
+
+    extracted_files, temp_dir = extract_source_entries(str(zip_path))
+    try:
+        files = {f["path"]: f["content"] for f in smart_filter_files(extracted_files, temp_dir)}
+    finally:
+        cleanup_temp_files([temp_dir])
+
+    assert files["repo/a/vendor.js"] is files["repo/b/vendor.js"]
+    assert files["repo/c.js"] == "var y = 2;\n"
+
+
+def test_format_repo_structure_lists_folders_first():
+    files = [{"path": "b.py"}, {"path": "src/z.py"}, {"path": "src/lib/a.py"}, {"path": "A.md"}]
+
+    assert format_repo_structure(files) == (
+        "Directory Structure:\n\n"
+        "├── src/\n"
+        "│   ├── lib/\n"
+        "│   │   └── a.py\n"
+        "│   └── z.py\n"
+        "├── A.md\n"
+        "└── b.py\n"
+    )
+
+
+def test_iter_format_repo_contents_yields_file_contents_uncopied():
+    files = [
+        {"path": "b.py", "content": "b = 2\n"},
+        {"path": "a/x.py", "content": "x = 1\n"},
+    ]
+    chunks = list(iter_format_repo_contents(files))
+
+    assert "File: a/x.py" in chunks[1]
+    assert chunks[2] is files[1]["content"]
+    assert chunks[4] is files[0]["content"]
+    assert "".join(chunks) == format_repo_contents(files)
+
+
+def test_zip_entries_are_cached_until_archive_changes(repo_zip):
+    first = read_zip_source_entries(repo_zip)
+    assert read_zip_source_entries(repo_zip) is first
+
+    with zipfile.ZipFile(repo_zip, "a") as zf:
+        zf.writestr("owner-repo-abc123/extra.py", "y = 2\n")
+    os.utime(repo_zip, ns=(0, os.stat(repo_zip).st_mtime_ns + 1_000_000))
+
+    second = read_zip_source_entries(repo_zip)
+    assert second is not first
+    assert "owner-repo-abc123/extra.py" in [path for path, _ in second]
+
+
+def test_zip_entry_cache_evicts_least_recently_used():
+    cache = ZipEntryCache(max_bytes=10)
+    cache.put(("a",), [("a.py", b"12345")])
+    cache.put(("b",), [("b.py", b"12345")])
+    cache.get(("a",))
+    cache.put(("c",), [("c.py", b"12345")])
+
+    assert cache.get(("a",)) is not None
+    assert cache.get(("b",)) is None
+    assert cache.get(("c",)) is not None
+    assert zip_entry_cache.max_bytes > 0
@@ -3,7 +3,6 @@ Optimized Agentic LangGraph Chat Service with Reliable Tool Calling
 Fixed tool calling issues, improved system prompts, and better error handling
 """
 
-import json
 import asyncio
 from typing import Dict, List, Any, AsyncGenerator, Optional, TypedDict, Annotated, Literal
 from datetime import datetime
@@ -35,6 +34,7 @@ except ImportError:
 
 # Import our services
 from utils.langchain_llm_service import langchain_service
+from utils.json_utils import ndjson_line
 from utils.gitvizz_tools import gitvizz_tools_service
 from models.repository import Repository
 
@@ -406,20 +406,20 @@ Provide a clear, structured response that directly answers the user's question u
         try:
             zip_file_path = repository.file_paths.zip if repository.file_paths else None
             if not zip_file_path:
-                yield json.dumps({
+                yield ndjson_line({
                     "event": "error",
                     "error": "No ZIP file available for GitVizz analysis",
                     "error_type": "no_zip_file"
-                }) + "\n"
+                })
                 return
 
             graph = await self.get_or_create_graph(str(repository.id), zip_file_path)
             if not graph:
-                yield json.dumps({
+                yield ndjson_line({
                     "event": "error",
                     "error": "Unable to create analysis graph",
                     "error_type": "graph_creation_failed"
-                }) + "\n"
+                })
                 return
 
             # Enhanced initial state
@@ -449,14 +449,21 @@ Provide a clear, structured response that directly answers the user's question u
 
             config = {"configurable": {"thread_id": thread_id or f"chat_{chat_id}"}}
 
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "progress",
                 "step": "initializing",
                 "message": "Starting enhanced agentic analysis...",
-            }) + "\n"
+            })
 
-            accumulated_response = ""
+            response_parts = []
             active_tools = set()
+            # Identifiers for the complete event; token events stay minimal
+            stream_meta = {
+                "chat_id": chat_id,
+                "conversation_id": conversation_id,
+                "provider": provider,
+                "model": model,
+            }
 
             async for event in graph.astream_events(initial_state, config, version="v2"):
                 event_type = event.get("event")
@@ -464,42 +471,42 @@ Provide a clear, structured response that directly answers the user's question u
 
                 if event_type == "on_chain_start":
                     if "analyze_and_plan" in event_name:
-                        yield json.dumps({
+                        yield ndjson_line({
                             "event": "progress",
                             "step": "planning",
                             "message": "Analyzing query and planning tool usage...",
-                        }) + "\n"
+                        })
                     elif "force_tool_selection" in event_name:
-                        yield json.dumps({
+                        yield ndjson_line({
                             "event": "progress",
                             "step": "tool_selection",
                             "message": "Selecting appropriate GitVizz tools...",
-                        }) + "\n"
+                        })
                     elif "agent_with_tools" in event_name:
-                        yield json.dumps({
+                        yield ndjson_line({
                             "event": "progress",
                             "step": "agent_thinking",
                             "message": "Agent analyzing with tools...",
-                        }) + "\n"
+                        })
                     elif "synthesize_response" in event_name:
-                        yield json.dumps({
+                        yield ndjson_line({
                             "event": "progress",
                             "step": "synthesizing",
                             "message": "Synthesizing final response...",
-                        }) + "\n"
+                        })
 
                 elif event_type == "on_tool_start":
                     tool_name = event.get("name", "unknown_tool")
                     tool_input = event.get("data", {}).get("input", {})
                     active_tools.add(tool_name)
 
-                    yield json.dumps({
+                    yield ndjson_line({
                         "event": "function_call",
                         "function_name": tool_name,
                         "arguments": tool_input if isinstance(tool_input, dict) else {"input": str(tool_input)},
                         "status": "started",
                         "message": f"🔧 Analyzing with {tool_name.replace('_', ' ').title()}...",
-                    }) + "\n"
+                    })
 
                 elif event_type == "on_tool_end":
                     # Add delay for better UX
@@ -515,38 +522,31 @@ Provide a clear, structured response that directly answers the user's question u
                     else:
                         truncated_result = tool_output_str
 
-                    yield json.dumps({
+                    yield ndjson_line({
                         "event": "function_complete",
                         "function_name": tool_name,
                         "result": truncated_result,
                         "status": "completed",
                         "message": f"✅ Completed {tool_name.replace('_', ' ').title()}",
-                    }) + "\n"
+                    })
 
                 elif event_type == "on_chat_model_stream":
                     chunk = event.get("data", {}).get("chunk")
                     if chunk and hasattr(chunk, "content") and chunk.content:
-                        accumulated_response += chunk.content
-                        yield json.dumps({
+                        response_parts.append(chunk.content)
+                        yield ndjson_line({
                             "event": "token",
                             "token": chunk.content,
-                            "chat_id": chat_id,
-                            "conversation_id": conversation_id,
-                            "provider": provider,
-                            "model": model,
-                        }) + "\n"
+                        })
 
             # Final completion
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "complete",
                 "message": "Enhanced agentic analysis completed",
-                "response": accumulated_response,
-                "chat_id": chat_id,
-                "conversation_id": conversation_id,
-                "provider": provider,
-                "model": model,
+                "response": "".join(response_parts),
+                **stream_meta,
                 "usage": {},
-            }) + "\n"
+            })
 
         except Exception as e:
             logger.error(f"Streaming error: {str(e)}")
@@ -560,22 +560,22 @@ Provide a clear, structured response that directly answers the user's question u
             elif "gitvizz" in error_msg.lower():
                 error_type = "gitvizz_error"
 
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "error",
                 "error": error_msg,
                 "error_type": error_type
-            }) + "\n"
+            })
 
     async def _fallback_streaming(
         self, user_query: str, user: Any, model: str, provider: str
     ) -> AsyncGenerator[str, None]:
         """Enhanced fallback streaming"""
         try:
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "progress",
                 "step": "fallback_mode",
                 "message": "Using fallback mode - LangGraph not available",
-            }) + "\n"
+            })
 
             chat_model = await langchain_service.get_chat_model(
                 model=model, user=user, temperature=0.7
@@ -590,21 +590,21 @@ While GitVizz tools are not available, provide the best analysis you can based o
             async for chunk in chat_model.astream(messages):
                 if chunk.content:
                     accumulated += chunk.content
-                    yield json.dumps({"event": "token", "token": chunk.content}) + "\n"
+                    yield ndjson_line({"event": "token", "token": chunk.content})
 
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "complete",
                 "message": "Fallback analysis completed",
                 "response": accumulated
-            }) + "\n"
+            })
 
         except Exception as e:
             logger.error(f"Fallback error: {str(e)}")
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "error",
                 "error": str(e),
                 "error_type": "fallback_error"
-            }) + "\n"
+            })
 
 
 # Global instance
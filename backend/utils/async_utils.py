@@ -0,0 +1,44 @@
+"""
+Async iteration helpers for streaming paths
+"""
+
+import asyncio
+from contextlib import suppress
+from typing import AsyncIterator, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+
+
+async def prefetch(source: AsyncIterator[T], size: int = 1) -> AsyncIterator[T]:
+    """Pull items from `source` in a background task, up to `size` ahead of the consumer.
+
+    Lets the upstream generator produce its next item while the caller is still
+    handling the current one. Upstream errors are re-raised to the consumer and
+    the producer task is cancelled when the consumer stops early.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+
+    async def feed() -> None:
+        try:
+            async for item in source:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((_END, e))
+            return
+        await queue.put((_END, None))
+
+    task = asyncio.create_task(feed())
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
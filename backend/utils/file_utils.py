@@ -1,14 +1,180 @@
+import asyncio
 import os
 import json
+import mmap
 import shutil
 import hashlib
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Type, TypeVar
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+
+from pydantic import BaseModel
 
 from models.repository import FilePaths
+from utils.json_utils import json_dumps_pretty, json_loads
 from dotenv import load_dotenv
 
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Files above this size are memory-mapped when only a prefix is needed
+MMAP_THRESHOLD_BYTES = 1 << 20
+
+# Repository text is stored zstd-compressed when zstandard is installed
+ZSTD_SUFFIX = ".zst"
+ZSTD_LEVEL = 3
+ZSTD_FRAME_HEADER_MAX_BYTES = 18
+
+
+def _is_zstd_path(file_path: str) -> bool:
+    return file_path.endswith(ZSTD_SUFFIX)
+
+
+def _normalize_newlines(text: str) -> str:
+    # Match text-mode reads of the uncompressed file
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def text_content_size(file_path: str) -> int:
+    """Size in bytes of a stored text file's uncompressed content."""
+    if _is_zstd_path(file_path):
+        with open(file_path, "rb") as f:
+            content_size = zstandard.frame_content_size(f.read(ZSTD_FRAME_HEADER_MAX_BYTES))
+        if content_size >= 0:
+            return content_size
+    return os.path.getsize(file_path)
+
+
+def read_text_prefix(file_path: str, max_bytes: int) -> str:
+    """Read at most max_bytes of a UTF-8 text file without loading the rest.
+
+    Large files are memory-mapped and sliced, and compressed files are only
+    decompressed up to max_bytes; undecodable bytes (including a multi-byte
+    character cut at the boundary) are dropped.
+    """
+    if _is_zstd_path(file_path):
+        with open(file_path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            data = reader.read(max_bytes)
+        return _normalize_newlines(data.decode("utf-8", errors="ignore"))
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data = mm[:max_bytes]
+        else:
+            data = f.read(max_bytes)
+    return _normalize_newlines(data.decode("utf-8", errors="ignore"))
+
+
+def _file_matches(file_path: str, data: bytes, chunk_size: int = 1 << 20) -> bool:
+    """Return True when the file at file_path already holds exactly `data`"""
+    try:
+        if os.path.getsize(file_path) != len(data):
+            return False
+        view = memoryview(data)
+        with open(file_path, "rb") as f:
+            offset = 0
+            while chunk := f.read(chunk_size):
+                if chunk != view[offset:offset + len(chunk)]:
+                    return False
+                offset += len(chunk)
+        return True
+    except OSError:
+        return False
+
+
+def write_bytes_if_changed(file_path: str, data: bytes) -> bool:
+    """Atomically replace file_path with data unless it already has that content.
+
+    Returns True if the file was written, False if it was left untouched.
+    """
+    if _file_matches(file_path, data):
+        return False
+    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return True
+
+
+def write_json_if_changed(file_path: str, data: Dict[str, Any]) -> bool:
+    """Write data as pretty JSON unless the file already holds it.
+
+    metadata.created_at changes on every save, so when everything else is
+    unchanged the stored timestamp is reused and the file is left untouched.
+    """
+    metadata = data.get("metadata")
+    if isinstance(metadata, dict) and "created_at" in metadata and os.path.exists(file_path):
+        try:
+            with open(file_path, "rb") as f:
+                previous = json_loads(f.read()).get("metadata", {}).get("created_at")
+        except (OSError, ValueError, AttributeError):
+            previous = None
+        if previous is not None:
+            unchanged = json_dumps_pretty({**data, "metadata": {**metadata, "created_at": previous}})
+            if _file_matches(file_path, unchanged):
+                return False
+    return write_bytes_if_changed(file_path, json_dumps_pretty(data))
+
+
+def move_file_into_place(source_path: str, file_path: str) -> None:
+    """Move a finished file (e.g. a streamed download) to file_path, replacing it.
+
+    This is a rename when both paths are on one filesystem, otherwise a copy.
+    """
+    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(source_path, file_path)
+
+
+def _read_text_file(file_path: str) -> str:
+    if _is_zstd_path(file_path):
+        with open(file_path, "rb") as f:
+            data = zstandard.ZstdDecompressor().decompress(f.read())
+        return _normalize_newlines(data.decode("utf-8"))
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _write_text_file(file_path: str, content: str) -> None:
+    data = content.encode("utf-8")
+    if _is_zstd_path(file_path):
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        # Drop the uncompressed copy left by an earlier save
+        plain_path = file_path[:-len(ZSTD_SUFFIX)]
+        if os.path.exists(plain_path):
+            os.unlink(plain_path)
+    # Unchanged repositories are re-saved on every upload; identical files are skipped
+    write_bytes_if_changed(file_path, data)
+
+
+def read_json_file(file_path: str) -> Any:
+    """Read and parse a stored JSON file (orjson when available)."""
+    with open(file_path, "rb") as f:
+        data = f.read()
+    try:
+        return json_loads(data)
+    except json.JSONDecodeError:
+        # orjson is strict (e.g. NaN); fall back to the stdlib parser that wrote the file
+        return json.loads(data)
+
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def _read_json_model(file_path: str, model: Type[ModelT]) -> ModelT:
+    with open(file_path, "rb") as f:
+        return model.model_validate_json(f.read())
+
 
 class FileManager:
     """Utility class for managing file storage operations."""
@@ -44,7 +210,7 @@ class FileManager:
         
         return FilePaths(
             zip=str(base_dir / "repository.zip"),
-            text=str(base_dir / "content.txt"),
+            text=str(base_dir / ("content.txt" + ZSTD_SUFFIX if ZSTD_AVAILABLE else "content.txt")),
             json_file=str(base_dir / "data.json"),
             documentation_base_path=str(doc_dir)
         )
@@ -52,31 +218,26 @@ class FileManager:
     async def save_text_content(self, file_path: str, content: str) -> bool:
         """Save text content to file."""
         try:
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
+            await asyncio.to_thread(_write_text_file, file_path, content)
             return True
         except Exception as e:
             print(f"Error saving text content to {file_path}: {e}")
             return False
     
-    async def save_zip_content(self, file_path: str, zip_content: bytes) -> bool:
-        """Save ZIP content to file."""
+    async def save_zip_file(self, file_path: str, source_path: str) -> bool:
+        """Save a ZIP already on disk by moving it into storage."""
         try:
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-            with open(file_path, "wb") as f:
-                f.write(zip_content)
+            await asyncio.to_thread(move_file_into_place, source_path, file_path)
             return True
         except Exception as e:
-            print(f"Error saving ZIP content to {file_path}: {e}")
+            print(f"Error saving ZIP file to {file_path}: {e}")
             return False
     
     async def save_json_data(self, file_path: str, data: Dict[str, Any]) -> bool:
         """Save JSON data to file."""
         try:
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, default=str)
+            # Graph payloads can be several MB; serialize and write off the event loop
+            await asyncio.to_thread(write_json_if_changed, file_path, data)
             return True
         except Exception as e:
             print(f"Error saving JSON data to {file_path}: {e}")
@@ -85,10 +246,10 @@ class FileManager:
     async def load_text_content(self, file_path: str) -> Optional[str]:
         """Load text content from file."""
         try:
-            if not os.path.exists(file_path):
-                return None
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
+            # Cached content can be several MB; read it off the event loop
+            return await asyncio.to_thread(_read_text_file, file_path)
+        except FileNotFoundError:
+            return None
         except Exception as e:
             print(f"Error loading text content from {file_path}: {e}")
             return None
@@ -96,17 +257,31 @@ class FileManager:
     async def load_json_data(self, file_path: str) -> Optional[Dict[str, Any]]:
         """Load JSON data from file."""
         try:
-            if not os.path.exists(file_path):
-                return None
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return await asyncio.to_thread(read_json_file, file_path)
+        except FileNotFoundError:
+            return None
         except Exception as e:
             print(f"Error loading JSON data from {file_path}: {e}")
             return None
     
+    async def load_json_model(self, file_path: str, model: Type[ModelT]) -> Optional[ModelT]:
+        """Load a JSON file straight into a Pydantic model.
+
+        Parsing and validation happen in one pass without building an
+        intermediate dict; returns None if the file is missing or invalid.
+        """
+        try:
+            return await asyncio.to_thread(_read_json_model, file_path, model)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading JSON model from {file_path}: {e}")
+            return None
+    
     def file_exists(self, file_path: str) -> bool:
         """Check if file exists."""
-        return os.path.exists(file_path) and os.path.isfile(file_path)
+        # isfile() is False for missing paths, so one stat answers both questions
+        return os.path.isfile(file_path)
     
     def get_file_size(self, file_path: str) -> Optional[int]:
         """Get file size in bytes."""
@@ -213,6 +388,10 @@ class FileManager:
     
     async def validate_file_paths(self, file_paths: FilePaths) -> Dict[str, bool]:
         """Validate that all file paths exist and are accessible."""
+        # All checks run in one worker thread, one stat per path
+        return await asyncio.to_thread(self._validate_file_paths_sync, file_paths)
+    
+    def _validate_file_paths_sync(self, file_paths: FilePaths) -> Dict[str, bool]:
         validation_result = {}
         
         if file_paths.text:
@@ -313,7 +492,7 @@ async def save_repository_files(
     formatted_text: str,
     graph_data: Optional[Dict[str, Any]] = None,
     structure_data: Optional[Dict[str, Any]] = None,
-    zip_content: Optional[bytes] = None
+    zip_path: Optional[str] = None
 ) -> FilePaths:
     """
     Save all repository files to storage.
@@ -324,7 +503,7 @@ async def save_repository_files(
         formatted_text: Text content to save
         graph_data: Optional graph data
         structure_data: Optional structure data
-        zip_content: Optional ZIP file content
+        zip_path: Optional ZIP file on disk, moved into storage
     
     Returns:
         FilePaths object with paths to saved files
@@ -336,17 +515,6 @@ async def save_repository_files(
     file_paths = file_manager.generate_file_paths(user_id, repo_identifier)
     
     try:
-        # Save text content
-        text_saved = await file_manager.save_text_content(file_paths.text, formatted_text)
-        if not text_saved:
-            raise Exception("Failed to save text content")
-        
-        # Save ZIP content if provided
-        if zip_content and file_paths.zip:
-            zip_saved = await file_manager.save_zip_content(file_paths.zip, zip_content)
-            if not zip_saved:
-                print("Warning: Failed to save ZIP content")
-        
         # Prepare JSON data
         json_data = {}
         if graph_data:
@@ -361,8 +529,19 @@ async def save_repository_files(
             "user_id": user_id
         }
         
-        # Save JSON data
-        json_saved = await file_manager.save_json_data(file_paths.json_file, json_data)
+        # The three files are independent, so their writes overlap in worker threads
+        writes = [
+            file_manager.save_text_content(file_paths.text, formatted_text),
+            file_manager.save_json_data(file_paths.json_file, json_data),
+        ]
+        if zip_path and file_paths.zip:
+            writes.append(file_manager.save_zip_file(file_paths.zip, zip_path))
+        text_saved, json_saved, *zip_saved = await asyncio.gather(*writes)
+        
+        if not text_saved:
+            raise Exception("Failed to save text content")
+        if zip_saved and not zip_saved[0]:
+            print("Warning: Failed to save ZIP content")
         if not json_saved:
             raise Exception("Failed to save JSON data")
         
@@ -375,6 +554,13 @@ async def save_repository_files(
         raise
 
 
+@lru_cache(maxsize=4096)
+def _zip_repo_identifier(zip_filename: str) -> str:
+    # Create a hash of the filename for consistency; existing repositories are
+    # stored under this md5-based name, so the hash must not change
+    return f"zip_{hashlib.md5(zip_filename.encode()).hexdigest()[:8]}"
+
+
 def generate_repo_identifier(repo_url: Optional[str], zip_filename: Optional[str], branch: str = "main") -> str:
     """Generate a unique identifier for the repository using owner/repo/branch format."""
     if repo_url:
@@ -382,8 +568,7 @@ def generate_repo_identifier(repo_url: Optional[str], zip_filename: Optional[str
         repo_info = parse_repo_url(repo_url)
         return f"{repo_info['owner']}/{repo_info['repo']}/{branch}"
     elif zip_filename:
-        # Create a hash of the filename for consistency
-        return f"zip_{hashlib.md5(zip_filename.encode()).hexdigest()[:8]}"
+        return _zip_repo_identifier(zip_filename)
     return f"unknown_repo_{datetime.utcnow().timestamp()}"
 
 
@@ -0,0 +1,71 @@
+"""
+Graph generation off the event loop
+GraphGenerator parsing is CPU-bound Python, so it runs in a pool of worker
+processes: the event loop stays free and concurrent graph requests don't
+contend for one GIL. The pool is shut down from the app lifespan.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from config import CONFIG
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _generate_from_source(source: str, options: Dict[str, Any]) -> dict:
+    from gitvizz import GraphGenerator
+
+    return GraphGenerator.from_source(source, **options).generate()
+
+
+def _generate_from_files(files: List[dict]) -> dict:
+    from gitvizz import GraphGenerator
+
+    return GraphGenerator(files=files, output_html_path=None).generate()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that is running an event loop and threads isn't safe
+        _executor = ProcessPoolExecutor(
+            max_workers=CONFIG["graph_worker_processes"],
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def _run(fn: Callable[[], dict]) -> dict:
+    if CONFIG["graph_worker_processes"] <= 0:
+        return await asyncio.to_thread(fn)
+
+    global _executor
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool for later requests
+        _executor = None
+        raise
+
+
+async def generate_graph_from_source(source: str, **options: Any) -> dict:
+    """GraphGenerator.from_source(source, **options).generate() in a worker."""
+    return await _run(functools.partial(_generate_from_source, source, options))
+
+
+async def generate_graph_from_files(files: List[dict]) -> dict:
+    """GraphGenerator(files=files).generate() in a worker."""
+    return await _run(functools.partial(_generate_from_files, files))
+
+
+def shutdown_graph_workers() -> None:
+    """Stop the worker processes if the pool was ever started"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
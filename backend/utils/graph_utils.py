@@ -3,7 +3,6 @@ Graph Utilities - Core graph operations and search functionality
 Handles loading, searching, and context generation from repository graph data
 """
 
-import json
 import re
 import logging
 from typing import Dict, List, Optional, Set, Tuple, Any, Union
@@ -14,6 +13,7 @@ import time
 from difflib import SequenceMatcher
 
 from schemas.graph_schemas import GraphNode, GraphEdge, GraphData
+from utils.file_utils import read_json_file
 
 logger = logging.getLogger(__name__)
 
@@ -58,8 +58,7 @@ class GraphUtils:
             logger.info(f"Loading graph data from: {file_path}")
             start_time = time.time()
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = read_json_file(file_path)
             
             # Handle nested structure: {"graph": {"nodes": [...], "edges": [...]}} 
             # or flat structure: {"nodes": [...], "edges": [...]}
@@ -0,0 +1,51 @@
+"""
+Shared outbound HTTP client
+One pooled httpx.AsyncClient is reused so GitHub calls keep connections alive
+and never block the event loop; it is closed from the app lifespan
+"""
+
+import os
+from typing import Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# Read once at import; copy GITHUB_JSON_HEADERS before adding per-request headers
+GITHUB_USER_AGENT = os.getenv("GITHUB_USER_AGENT", "fastapi-app")
+GITHUB_JSON_HEADERS = {
+    "Accept": "application/vnd.github.v3+json",
+    "User-Agent": GITHUB_USER_AGENT,
+}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use.
+
+    Redirects are followed (GitHub zipball URLs redirect to codeload).
+    HTTP/2 is used when the optional h2 package is installed.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client if it was ever opened"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,103 @@
+"""
+JSON helpers for hot paths
+Uses orjson when installed and falls back to the standard library otherwise
+"""
+
+import json
+from typing import Any, Iterator, Union
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document; surrounding whitespace is allowed.
+
+    Raises json.JSONDecodeError (orjson.JSONDecodeError subclasses it).
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps_pretty(payload: Any) -> bytes:
+    """Serialize a payload as 2-space indented UTF-8 JSON for storage.
+
+    Values JSON can't represent (datetimes included) are written with str(),
+    matching json.dumps(..., default=str).
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            payload,
+            default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    return json.dumps(payload, indent=2, default=str, ensure_ascii=False).encode("utf-8")
+
+
+def model_json_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Return a response model as an already-encoded JSON response.
+
+    pydantic-core writes the same document FastAPI would (aliases included), but
+    in one native pass, and FastAPI skips re-validating and re-encoding a
+    returned Response. Meant for large payloads such as graphs and file dumps.
+    """
+    return Response(
+        content=model.model_dump_json(by_alias=True),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def ndjson_line(payload: Any) -> str:
+    """Serialize a payload as a single newline-terminated NDJSON line."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE).decode()
+    return json.dumps(payload) + "\n"
+
+
+def ndjson_bytes(payload: Any) -> bytes:
+    """Serialize a payload as a newline-terminated NDJSON line, ready to write to the socket."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(payload) + "\n").encode()
+
+
+class NDJSONBuffer:
+    """Reassemble NDJSON objects from arbitrarily split text chunks.
+
+    Chunks may carry a partial line or several lines; only complete,
+    non-blank lines are parsed. Lines that fail to parse are skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> Iterator[Any]:
+        """Add a chunk and yield every object completed by it."""
+        self._buffer += chunk
+        if "\n" not in self._buffer:
+            return
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            yield from self._parse(line)
+
+    def flush(self) -> Iterator[Any]:
+        """Yield a trailing object left without a terminating newline."""
+        line, self._buffer = self._buffer, ""
+        yield from self._parse(line)
+
+    @staticmethod
+    def _parse(line: str) -> Iterator[Any]:
+        if not line.strip():
+            return
+        try:
+            yield json_loads(line)
+        except json.JSONDecodeError:
+            return
@@ -1,5 +1,8 @@
 from jose import jwt, JWTError, ExpiredSignatureError
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import hashlib
+import time
 from models.user import User
 from beanie.operators import Or
 from fastapi import HTTPException, Header
@@ -16,6 +19,22 @@ REFRESH_TOKEN_EXPIRE_DAYS = int(
     os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30)
 )  # Default to 30 days
 
+# Resolved access tokens are cached briefly so hot users skip JWT decoding and the user lookup
+USER_CACHE_TTL_SECONDS = 60
+USER_CACHE_MAX_SIZE = 10_000
+_user_cache: "OrderedDict[bytes, tuple[float, User]]" = OrderedDict()
+
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    """Drop cached token resolutions for a user after their record changes"""
+    stale_keys = [key for key, (_, user) in _user_cache.items() if str(user.id) == user_id]
+    for key in stale_keys:
+        _user_cache.pop(key, None)
+
 
 async def create_jwt_token(identifier: str):
     # Fetch user from DB using either email or username
@@ -112,6 +131,14 @@ async def refresh_access_token(refresh_token: str):
 # Helper function to decode JWT token from string
 async def _decode_jwt_token(token: str) -> Optional[User]:
     """Internal function to decode JWT token and return user"""
+    cache_key = _token_cache_key(token)
+    cached = _user_cache.get(cache_key)
+    if cached is not None:
+        if cached[0] > time.time():
+            _user_cache.move_to_end(cache_key)
+            return cached[1]
+        _user_cache.pop(cache_key, None)
+
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
 
@@ -127,6 +154,12 @@ async def _decode_jwt_token(token: str) -> Optional[User]:
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
+        # Never serve a cached user past the token's own expiry
+        expires_at = min(time.time() + USER_CACHE_TTL_SECONDS, payload.get("exp", 0))
+        _user_cache[cache_key] = (expires_at, user)
+        while len(_user_cache) > USER_CACHE_MAX_SIZE:
+            _user_cache.popitem(last=False)
+
         return user
 
     except ExpiredSignatureError:
@@ -4,7 +4,6 @@ Advanced chat system with streaming, memory, and repository context analysis
 Uses LangGraph for orchestration and state management
 """
 
-import json
 import asyncio
 from typing import Dict, List, Any, AsyncGenerator, Optional, TypedDict
 from datetime import datetime
@@ -23,6 +22,7 @@ except ImportError:
 
 # Import our LangChain service
 from utils.langchain_llm_service import langchain_service
+from utils.json_utils import ndjson_line
 
 
 class ChatState(TypedDict):
@@ -301,22 +301,22 @@ Provide detailed, accurate responses based on the repository content."""
             elif any(keyword in user_query.lower() for keyword in ["explain", "how", "what", "why"]):
                 analysis_type = "explanation"
             
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "progress",
                 "step": "query_analyzed",
                 "analysis_type": analysis_type
-            }) + "\n"
+            })
             
             # Step 2: Use provided context or create placeholder
             if repository_context is None:
                 repository_context = f"Repository context for {repository_id} (analysis type: {analysis_type})"
             
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "progress",
                 "step": "context_retrieved", 
                 "context_length": len(repository_context),
                 "context_metadata": context_metadata
-            }) + "\n"
+            })
             
             # Step 3: Generate streaming response
             # Check if it's a reasoning model and enable traces
@@ -367,7 +367,7 @@ Provide detailed, accurate responses based on the repository content."""
                     HumanMessage(content=user_query)
                 ]
             
-            accumulated_response = ""
+            response_parts = []
             accumulated_reasoning = ""
             
             # Stream the LLM response with reasoning traces support
@@ -378,24 +378,24 @@ Provide detailed, accurate responses based on the repository content."""
                     reasoning_content = chunk.additional_kwargs.get('reasoning', '')
                     if reasoning_content and reasoning_content not in accumulated_reasoning:
                         accumulated_reasoning += reasoning_content
-                        yield json.dumps({
+                        yield ndjson_line({
                             "event": "reasoning",
                             "reasoning": reasoning_content
-                        }) + "\n"
+                        })
                 
                 # Handle regular content
                 if chunk.content:
-                    accumulated_response += chunk.content
-                    yield json.dumps({
+                    response_parts.append(chunk.content)
+                    yield ndjson_line({
                         "event": "token",
                         "token": chunk.content
-                    }) + "\n"
+                    })
             
             # Final completion
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "complete",
-                "response": accumulated_response
-            }) + "\n"
+                "response": "".join(response_parts)
+            })
             
         except Exception as e:
             error_msg = str(e)
@@ -414,7 +414,7 @@ Provide detailed, accurate responses based on the repository content."""
             else:
                 event_data["error_type"] = "server_error"
                 
-            yield json.dumps(event_data) + "\n"
+            yield ndjson_line(event_data)
     
     async def _fallback_chat_processing(
         self,
@@ -467,14 +467,14 @@ Provide detailed, accurate responses based on the repository content."""
             
             async for chunk in chat_model.astream(messages):
                 if chunk.content:
-                    yield json.dumps({
+                    yield ndjson_line({
                         "event": "token",
                         "token": chunk.content
-                    }) + "\n"
+                    })
             
-            yield json.dumps({
+            yield ndjson_line({
                 "event": "complete"
-            }) + "\n"
+            })
             
         except Exception as e:
             error_msg = str(e)
@@ -493,7 +493,7 @@ Provide detailed, accurate responses based on the repository content."""
             else:
                 event_data["error_type"] = "server_error"
                 
-            yield json.dumps(event_data) + "\n"
+            yield ndjson_line(event_data)
 
 
 # Global instance
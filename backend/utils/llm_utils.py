@@ -678,10 +678,13 @@ class LLMService:
         # Extract usage
         usage = None
         if hasattr(response, 'usage'):
+            # Prompt-cache hits are reported separately and billed at a discount
+            prompt_details = getattr(response.usage, 'prompt_tokens_details', None)
             usage = {
                 "prompt_tokens": response.usage.prompt_tokens,
                 "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens
+                "total_tokens": response.usage.total_tokens,
+                "cached_tokens": getattr(prompt_details, 'cached_tokens', None) or 0
             }
         
         return LLMResponse(
@@ -1,15 +1,20 @@
+import asyncio
 import os
 import re
 import tempfile
 import shutil
 import zipfile
 import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Tuple
-from fastapi import UploadFile, HTTPException
-import requests
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
 from urllib.parse import urlparse
 from config import CONFIG
+from utils.http_client import GITHUB_JSON_HEADERS, get_http_client
 from beanie import BeanieObjectId
 from models.repository import Repository
 from models.user import User
@@ -151,85 +156,99 @@ async def check_repository_access(repo_id: str, user: User) -> bool:
     except HTTPException:
         return False
 
+# Chunk size used when spooling uploaded archives to disk
+UPLOAD_COPY_CHUNK_SIZE = 1024 * 1024
+
+_REPO_URL_RE = re.compile(
+    r"github.com[:/](?P<owner>[^/]+)/(?P<repo>[^/#]+)(?:/(tree|blob)/(?P<last_string>.+))?"
+)
+
+
+@lru_cache(maxsize=4096)
+def _parse_repo_url_parts(repo_url: str) -> Tuple[Tuple[str, str], ...]:
+    m = _REPO_URL_RE.search(repo_url)
+    if not m:
+        return (("owner", "unknown"), ("repo", "repository"), ("last_string", ""))  # Default for non-matching URLs
+    return tuple(m.groupdict(default="").items())
+
+
 def parse_repo_url(repo_url: str) -> Dict[str, str]:
     """Parse GitHub repository URL into owner, repo, and optional branch/path."""
-    pattern = r"github.com[:/](?P<owner>[^/]+)/(?P<repo>[^/#]+)(?:/(tree|blob)/(?P<last_string>.+))?"
-    m = re.search(pattern, repo_url)
-    if not m:
-        return {
-            "owner": "unknown",
-            "repo": "repository",
-            "last_string": "",
-        }  # Default for non-matching URLs
-    return m.groupdict(default="")
-
-async def _process_input(
-    repo_url: Optional[str],
+    # The same URL is parsed several times per request; the parse is memoized
+    # and every caller gets its own dict
+    return dict(_parse_repo_url_parts(repo_url))
+
+ExtractResult = Tuple[List[Dict[str, Any]], str, List[str]]
+
+
+async def _extract_archive(
+    zip_path: str, should_keep: Optional[Callable[[zipfile.ZipInfo], bool]]
+) -> ExtractResult:
+    # Extract only the entries that would be kept (smart_filter_files' rules by default),
+    # off the event loop so other requests keep being served meanwhile
+    extracted_files, temp_extract_dir_path = await asyncio.to_thread(
+        extract_source_entries, zip_path, should_keep or is_source_zip_entry
+    )
+    return extracted_files, temp_extract_dir_path, [temp_extract_dir_path]
+
+
+def _github_zipball_request(repo_url: str, branch: Optional[str], access_token: Optional[str]) -> Tuple[str, dict]:
+    parsed = urlparse(repo_url)
+    if "github.com" not in parsed.netloc.lower():
+        # Direct ZIP link or unknown host
+        return repo_url, {}
+
+    # Normalize repo URL
+    path_parts = parsed.path.strip("/").split("/")
+    if len(path_parts) < 2:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid GitHub repo URL format. Expected 'https://github.com/owner/repo'.",
+        )
+
+    owner, repo = path_parts[:2]
+    safe_branch = branch or "main"
+
+    headers = GITHUB_JSON_HEADERS.copy()
+    if access_token:
+        headers["Authorization"] = f"Bearer {access_token}"
+    return f"https://api.github.com/repos/{owner}/{repo}/zipball/{safe_branch}", headers
+
+
+async def _process_url(
+    repo_url: str,
     branch: Optional[str],
-    zip_file: Optional[UploadFile],
     access_token: Optional[str] = None,
-) -> Tuple[List[Dict[str, Any]], str, List[str]]:
-    temp_zip_file_path: Optional[str] = None
-    created_dirs_for_rmtree: List[str] = []
-    headers = {}
+    should_keep: Optional[Callable[[zipfile.ZipInfo], bool]] = None,
+    archive_path: Optional[str] = None,
+) -> ExtractResult:
+    """Download a repository archive and extract its source entries.
 
+    With archive_path the download is written there and left for the caller
+    (e.g. to store it); otherwise it goes to a temp file that is removed.
+    """
+    temp_zip_file_path: Optional[str] = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as temp_zip_obj:
-            temp_zip_file_path = temp_zip_obj.name
-
-            if repo_url:
-                parsed = urlparse(repo_url)
-                if "github.com" in parsed.netloc.lower():
-                    # Normalize repo URL
-                    path_parts = parsed.path.strip("/").split("/")
-                    if len(path_parts) < 2:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="Invalid GitHub repo URL format. Expected 'https://github.com/owner/repo'.",
-                        )
-
-                    owner, repo = path_parts[:2]
-                    safe_branch = branch or "main"
-
-                    actual_zip_url = f"https://api.github.com/repos/{owner}/{repo}/zipball/{safe_branch}"
-
-                    headers = {
-                        "Accept": "application/vnd.github.v3+json",
-                        "User-Agent": os.getenv("GITHUB_USER_AGENT", "fastapi-app")
-                    }
-                    if access_token:
-                        headers["Authorization"] = f"Bearer {access_token}"
-                else:
-                    # Direct ZIP link or unknown host
-                    actual_zip_url = repo_url
+        actual_zip_url, headers = _github_zipball_request(repo_url, branch, access_token)
 
-                # Download ZIP
-                r = requests.get(actual_zip_url, stream=True, timeout=60, headers=headers)
+        if archive_path is None:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as temp_zip_obj:
+                temp_zip_file_path = temp_zip_obj.name
+        zip_path = archive_path or temp_zip_file_path
+
+        with open(zip_path, "wb") as zip_obj:
+            # Download ZIP on the shared async client so other requests keep being served
+            async with get_http_client().stream("GET", actual_zip_url, headers=headers) as r:
                 if r.status_code != 200:
                     raise HTTPException(
                         status_code=r.status_code,
                         detail=f"Failed to download ZIP. Status: {r.status_code} URL: {actual_zip_url}"
                     )
 
-                for chunk in r.iter_content(chunk_size=8192):
-                    temp_zip_obj.write(chunk)
-
-            elif zip_file:
-                content = await zip_file.read()
-                temp_zip_obj.write(content)
-                await zip_file.close()
-
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Either 'repo_url' or 'zip_file' must be provided."
-                )
+                async for chunk in r.aiter_bytes(UPLOAD_COPY_CHUNK_SIZE):
+                    zip_obj.write(chunk)
 
-        # Extract
-        extracted_files, temp_extract_dir_path = extract_zip_contents(temp_zip_file_path)
-        created_dirs_for_rmtree.append(temp_extract_dir_path)
-
-        return extracted_files, temp_extract_dir_path, created_dirs_for_rmtree
+        return await _extract_archive(zip_path, should_keep)
 
     except HTTPException:
         raise  # Pass through expected errors
@@ -241,8 +260,23 @@ async def _process_input(
     finally:
         if temp_zip_file_path and os.path.exists(temp_zip_file_path):
             os.unlink(temp_zip_file_path)
-  
-                     
+
+
+async def _process_upload(
+    zip_path: str,
+    should_keep: Optional[Callable[[zipfile.ZipInfo], bool]] = None,
+) -> ExtractResult:
+    """Extract the source entries of an archive already on disk; the archive is left in place."""
+    try:
+        return await _extract_archive(zip_path, should_keep)
+    except HTTPException:
+        raise  # Pass through expected errors
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing input: {str(e)}"
+        )
+
 
 def extract_zip_contents(zip_file_path: str) -> tuple[List[dict], str]:
     """Extract files from a ZIP archive and return file list with paths."""
@@ -266,130 +300,254 @@ def extract_zip_contents(zip_file_path: str) -> tuple[List[dict], str]:
     return files, temp_dir
 
 
+# Archives with at least this many selected entries (and bytes) are extracted on a
+# thread pool (zlib releases the GIL while inflating); smaller ones aren't worth the dispatch
+PARALLEL_EXTRACT_MIN_ENTRIES = 32
+PARALLEL_EXTRACT_MIN_BYTES = 128 * 1024
+EXTRACT_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+
+
+def is_source_zip_entry(info: zipfile.ZipInfo) -> bool:
+    """Whether smart_filter_files would keep this entry (by path, extension and size)."""
+    return (
+        not info.is_dir()
+        and 0 < info.file_size <= CONFIG["max_file_size"]
+        and _is_source_file_path(info.filename)
+    )
+
+
+def _source_entry_infos(
+    zip_ref: zipfile.ZipFile,
+    should_keep: Callable[[zipfile.ZipInfo], bool] = is_source_zip_entry,
+) -> List[zipfile.ZipInfo]:
+    return [info for info in zip_ref.infolist() if should_keep(info)]
+
+
+def _extract_target_dir(temp_dir: str, arcname: str) -> str:
+    # Mirror ZipFile's member path sanitizing so parent dirs can be created up front
+    parts = [p for p in arcname.split("/")[:-1] if p not in ("", ".", "..")]
+    return os.path.join(temp_dir, *parts)
+
+
+def _extract_parallel(
+    zip_file_path: str, infos: List[zipfile.ZipInfo], temp_dir: str
+) -> List[str]:
+    # Each worker reads through its own ZipFile handle so reads don't serialize
+    # on the shared file position lock of a single instance
+    local = threading.local()
+    handles: List[zipfile.ZipFile] = []
+    handles_lock = threading.Lock()
+
+    def extract(info: zipfile.ZipInfo) -> str:
+        zip_ref = getattr(local, "zip_ref", None)
+        if zip_ref is None:
+            zip_ref = local.zip_ref = zipfile.ZipFile(zip_file_path, "r")
+            with handles_lock:
+                handles.append(zip_ref)
+        return zip_ref.extract(info, temp_dir)
+
+    try:
+        with ThreadPoolExecutor(max_workers=EXTRACT_MAX_WORKERS) as pool:
+            return list(pool.map(extract, infos))
+    finally:
+        for zip_ref in handles:
+            zip_ref.close()
+
+
+def extract_source_entries(
+    zip_file_path: str,
+    should_keep: Callable[[zipfile.ZipInfo], bool] = is_source_zip_entry,
+) -> tuple[List[dict], str]:
+    """Extract only the entries accepted by should_keep from a ZIP archive.
+
+    Same result shape as extract_zip_contents, but entries that smart_filter_files
+    would drop (by default) are skipped before inflating and never hit disk, and
+    large archives are extracted in parallel.
+    """
+    temp_dir = tempfile.mkdtemp()
+    try:
+        with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
+            infos = _source_entry_infos(zip_ref, should_keep)
+            # Parents are created once here, so worker threads never race on makedirs
+            for target_dir in {_extract_target_dir(temp_dir, info.filename) for info in infos}:
+                os.makedirs(target_dir, exist_ok=True)
+
+            if (
+                len(infos) >= PARALLEL_EXTRACT_MIN_ENTRIES
+                and sum(info.compress_size for info in infos) >= PARALLEL_EXTRACT_MIN_BYTES
+            ):
+                full_paths = _extract_parallel(zip_file_path, infos, temp_dir)
+            else:
+                full_paths = [zip_ref.extract(info, temp_dir) for info in infos]
+
+        files = {}
+        for full_path in full_paths:
+            # Ensure rel_path is POSIX-style for consistency
+            rel_path = Path(os.path.relpath(full_path, temp_dir)).as_posix()
+            files[full_path] = {"path": rel_path, "full_path": full_path}
+    except zipfile.BadZipFile:
+        shutil.rmtree(temp_dir)  # Clean up extraction dir if zip is bad
+        raise HTTPException(status_code=400, detail="Invalid ZIP file.")
+    except Exception as e:
+        shutil.rmtree(temp_dir)  # Clean up extraction dir on other errors
+        raise HTTPException(status_code=500, detail=f"Failed to extract ZIP: {str(e)}")
+    return list(files.values()), temp_dir
+
+COMMON_EXTENSIONS = [
+    ".py",
+    ".js",
+    ".ts",
+    ".java",
+    ".cpp",
+    ".c",
+    ".h",
+    ".hpp",
+    ".cs",
+    ".go",
+    ".rs",
+    ".php",
+    ".rb",
+    ".swift",
+    ".html",
+    ".css",
+    ".scss",
+    ".json",
+    ".yaml",
+    ".yml",
+    ".md",
+    ".txt",
+    ".xml",
+    ".ini",
+    ".conf",
+    ".sh",
+    ".bat",
+    ".pl",
+    ".toml",
+    ".jsx",
+    ".tsx",
+    ".ipynb",
+]
+BLACKLIST_EXTENSIONS = [
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".bmp",
+    ".svg",
+    ".ico",
+    ".webp",
+    ".tiff",
+    ".mp3",
+    ".mp4",
+    ".avi",
+    ".mov",
+    ".mkv",
+    ".wav",
+    ".flac",
+    ".exe",
+    ".dll",
+    ".so",
+    ".bin",
+    ".obj",
+    ".o",
+    ".a",
+    ".lib",
+    ".class",
+    ".jar",
+    ".pdf",
+    ".zip",  # Exclude .zip from content processing
+]
+
+
+# Built once; a set lookup replaces scanning both lists for every file
+_SOURCE_EXTENSIONS = frozenset(COMMON_EXTENSIONS).difference(BLACKLIST_EXTENSIONS)
+
+# Dependency and cache directories skipped wholesale (hidden dirs such as .git are
+# skipped by name); ZIP entries under them are never inflated
+IGNORED_DIRECTORIES = frozenset({"node_modules", "__pycache__"})
+
+
+def _is_source_file_path(rel_path: str) -> bool:
+    """Check the extension and directory rules used to select source files."""
+    # Plain string splitting on the hot path; same results as Path.suffix / Path.parts
+    dir_path, _, name = rel_path.rpartition("/")
+    dot = name.rfind(".")
+    if not 0 < dot < len(name) - 1 or name[dot:].lower() not in _SOURCE_EXTENSIONS:
+        return False
+    return not any(
+        (part.startswith(".") and part not in (".", name)) or part in IGNORED_DIRECTORIES
+        for part in dir_path.split("/")
+    )  # Allow hidden files, but not in hidden or ignored dirs
+
+
+def _set_file_content(file_info: dict, text: str) -> None:
+    """Store file text on file_info; for .ipynb files, content is extracted from cells."""
+    if Path(file_info["path"]).suffix.lower() != ".ipynb":
+        file_info["content"] = text
+        return
+
+    parsed_notebook = json.loads(text)
+    all_cell_content_for_text_dump = []
+    python_code_for_graphing = []
+
+    for cell_idx, cell in enumerate(parsed_notebook.get("cells", [])):
+        cell_type = cell.get("cell_type")
+        source_list = cell.get("source", [])
+        cell_source_text = "".join(source_list)
+        all_cell_content_for_text_dump.append(
+            f"# CELL {cell_idx + 1}: {cell_type}\n{cell_source_text}\n"
+        )
+        if cell_type == "code":
+            # Basic check for python magic before adding to python_equivalent_content
+            lines = cell_source_text.splitlines()
+            if not any(
+                line.strip().startswith("%")
+                or line.strip().startswith("!")
+                for line in lines
+            ):
+                python_code_for_graphing.append(cell_source_text + "\n")
+
+    file_info["content"] = "\n".join(all_cell_content_for_text_dump)
+    file_info["python_equivalent_content"] = "".join(python_code_for_graphing)
+
+
+def _share_duplicate_contents(files: List[dict]) -> List[dict]:
+    """Point files with identical content at a single str object.
+
+    Vendored copies, fixtures and generated files often repeat; sharing the
+    string keeps one copy in memory (and in cached file lists) per unique content.
+    """
+    pool: Dict[str, str] = {}
+    for file_info in files:
+        content = file_info.get("content")
+        if content:
+            file_info["content"] = pool.setdefault(content, content)
+    return files
+
+
 def smart_filter_files(file_list: List[dict], temp_dir: str) -> List[dict]:
     """Filter files to include only source code and exclude images, binaries, etc.
     For .ipynb files, content is extracted from cells.
+
+    Reads are plain blocking calls; async callers should run the whole
+    function in one worker thread rather than awaiting each file.
     """
-    common_extensions = [
-        ".py",
-        ".js",
-        ".ts",
-        ".java",
-        ".cpp",
-        ".c",
-        ".h",
-        ".hpp",
-        ".cs",
-        ".go",
-        ".rs",
-        ".php",
-        ".rb",
-        ".swift",
-        ".html",
-        ".css",
-        ".scss",
-        ".json",
-        ".yaml",
-        ".yml",
-        ".md",
-        ".txt",
-        ".xml",
-        ".ini",
-        ".conf",
-        ".sh",
-        ".bat",
-        ".pl",
-        ".toml",
-        ".jsx",
-        ".tsx",
-        ".ipynb",
-    ]
-    blacklist_ext = [
-        ".png",
-        ".jpg",
-        ".jpeg",
-        ".gif",
-        ".bmp",
-        ".svg",
-        ".ico",
-        ".webp",
-        ".tiff",
-        ".mp3",
-        ".mp4",
-        ".avi",
-        ".mov",
-        ".mkv",
-        ".wav",
-        ".flac",
-        ".exe",
-        ".dll",
-        ".so",
-        ".bin",
-        ".obj",
-        ".o",
-        ".a",
-        ".lib",
-        ".class",
-        ".jar",
-        ".pdf",
-        ".zip",  # Exclude .zip from content processing
-    ]
     filtered_files = []
     for file_info in file_list:
-        ext = Path(file_info["path"]).suffix.lower()
-
         # full_path should already be correct from extract_zip_contents
         full_path = file_info["full_path"]
 
-        if not os.path.exists(
-            full_path
-        ):  # Should not happen if extract_zip_contents is robust
+        if not _is_source_file_path(file_info["path"]):
+            continue
+        try:
+            file_size = os.stat(full_path).st_size
+        except OSError:  # Should not happen if extract_zip_contents is robust
             continue
 
-        if (
-            ext in common_extensions
-            and ext not in blacklist_ext
-            and not any(
-                part.startswith(".")
-                for part in Path(file_info["path"]).parts
-                if part != Path(file_info["path"]).name
-            )  # Allow hidden files, but not in hidden dirs
-            and os.path.getsize(full_path) <= CONFIG["max_file_size"]
-            and os.path.getsize(full_path) > 0  # Exclude empty files
-        ):
+        if 0 < file_size <= CONFIG["max_file_size"]:  # Exclude empty files
             try:
-                if ext == ".ipynb":
-                    with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                        notebook_json_content = f.read()
-
-                    parsed_notebook = json.loads(notebook_json_content)
-                    all_cell_content_for_text_dump = []
-                    python_code_for_graphing = []
-
-                    for cell_idx, cell in enumerate(parsed_notebook.get("cells", [])):
-                        cell_type = cell.get("cell_type")
-                        source_list = cell.get("source", [])
-                        cell_source_text = "".join(source_list)
-                        all_cell_content_for_text_dump.append(
-                            f"# CELL {cell_idx + 1}: {cell_type}\n{cell_source_text}\n"
-                        )
-                        if cell_type == "code":
-                            # Basic check for python magic before adding to python_equivalent_content
-                            lines = cell_source_text.splitlines()
-                            if not any(
-                                line.strip().startswith("%")
-                                or line.strip().startswith("!")
-                                for line in lines
-                            ):
-                                python_code_for_graphing.append(cell_source_text + "\n")
-
-                    file_info["content"] = "\n".join(all_cell_content_for_text_dump)
-                    file_info["python_equivalent_content"] = "".join(
-                        python_code_for_graphing
-                    )
-                else:
-                    with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                        file_info["content"] = f.read()
+                with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                    _set_file_content(file_info, f.read())
 
                 filtered_files.append(file_info)
             except json.JSONDecodeError:
@@ -398,55 +556,162 @@ def smart_filter_files(file_list: List[dict], temp_dir: str) -> List[dict]:
             except Exception:
                 # print(f"Skipping file {file_info['path']} due to error during content processing: {e}")
                 continue
-    return filtered_files
+    return _share_duplicate_contents(filtered_files)
+
+
+class ZipEntryCache:
+    """LRU cache of raw ZIP source entries, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, List[Tuple[str, bytes]]]" = OrderedDict()
+        self._sizes: Dict[tuple, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[List[Tuple[str, bytes]]]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries is not None:
+                self._entries.move_to_end(key)
+            return entries
+
+    def put(self, key: tuple, entries: List[Tuple[str, bytes]]) -> None:
+        size = sum(len(data) for _, data in entries)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = entries
+            self._sizes[key] = size
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(evicted_key)
+
+
+zip_entry_cache = ZipEntryCache(CONFIG["zip_cache_max_bytes"])
+
+
+def read_zip_source_entries(zip_file_path: str) -> List[Tuple[str, bytes]]:
+    """Read the raw (path, bytes) of every source file in a ZIP archive.
+
+    Entries are selected with the same rules as smart_filter_files and cached
+    by (path, mtime, size), so repeated requests against an unchanged archive
+    skip decompression entirely.
+    """
+    stat = os.stat(zip_file_path)
+    cache_key = (zip_file_path, stat.st_mtime_ns, stat.st_size)
+    cached_entries = zip_entry_cache.get(cache_key)
+    if cached_entries is not None:
+        return cached_entries
+
+    entries = []
+    try:
+        with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
+            for info in _source_entry_infos(zip_ref):
+                entries.append((info.filename, zip_ref.read(info)))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Invalid ZIP file.")
+
+    zip_entry_cache.put(cache_key, entries)
+    return entries
+
+
+def zip_entry_to_file_info(rel_path: str, data: bytes) -> Optional[dict]:
+    """Build a file dict (path and content) from one in-memory ZIP entry.
+
+    Returns None when the content cannot be processed (e.g. an invalid .ipynb).
+    """
+    # Match text-mode reads: drop undecodable bytes and normalize newlines
+    text = data.decode("utf-8", errors="ignore")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    file_info = {"path": rel_path}
+    try:
+        _set_file_content(file_info, text)
+    except Exception:
+        return None
+    return file_info
+
+
+def smart_filter_zip_entries(entries: List[Tuple[str, bytes]]) -> List[dict]:
+    """Build filtered file dicts (path and content) from in-memory ZIP entries."""
+    filtered_files = []
+    for rel_path, data in entries:
+        file_info = zip_entry_to_file_info(rel_path, data)
+        if file_info is not None:
+            filtered_files.append(file_info)
+    return _share_duplicate_contents(filtered_files)
 
 
 def format_repo_structure(files: List[dict]) -> str:
     """Format repository directory structure into text."""
-    text = "Directory Structure:\n\n"
     tree = {}
     for file_item in files:  # Renamed 'file' to 'file_item' to avoid conflict
-        parts = file_item["path"].split("/")
+        *dirs, name = file_item["path"].split("/")
         current_level = tree
-        for i, part in enumerate(parts):
-            if part not in current_level:
-                current_level[part] = {} if i < len(parts) - 1 else None
-            current_level = current_level[part] if i < len(parts) - 1 else current_level
+        for part in dirs:
+            current_level = current_level.setdefault(part, {})
+        current_level.setdefault(name, None)
+
+    # Lines are collected and joined once; concatenating per entry is quadratic on large trees
+    lines = ["Directory Structure:\n\n"]
 
-    def build_index(node, prefix="", depth=0):
-        result = ""
+    def build_index(node, prefix=""):
         # Sort entries: folders first, then files, all alphabetically
         entries = sorted(node.items(), key=lambda x: (x[1] is None, x[0].lower()))
+        last_index = len(entries) - 1
         for i, (name, subnode) in enumerate(entries):
-            is_last = i == len(entries) - 1
+            is_last = i == last_index
             line_prefix = "└── " if is_last else "├── "
-            child_prefix = "    " if is_last else "│   "
-            result += (
-                f"{prefix}{line_prefix}{name}{'/' if subnode is not None else ''}\n"
-            )
-            if subnode is not None:
-                result += build_index(subnode, f"{prefix}{child_prefix}", depth + 1)
-        return result
+            if subnode is None:
+                lines.append(f"{prefix}{line_prefix}{name}\n")
+            else:
+                lines.append(f"{prefix}{line_prefix}{name}/\n")
+                build_index(subnode, prefix + ("    " if is_last else "│   "))
 
-    text += build_index(tree)
-    return text
+    build_index(tree)
+    return "".join(lines)
 
 
-def format_repo_contents(files: List[dict]) -> str:
-    """Format repository contents into LLM-friendly text with directory structure."""
-    structure_text = format_repo_structure(files)
-    content_text = "\n\nFile Contents:\n"
+def iter_format_repo_contents(files: List[dict]) -> Iterator[str]:
+    """Yield format_repo_contents' output piece by piece (structure, then each file's header and content).
+
+    File contents are yielded as the existing strings rather than copied into a
+    per-file section, so joining or streaming the pieces holds the text only once.
+    """
+    yield format_repo_structure(files)
+    separator = "\n\nFile Contents:\n"
     for file_item in sorted(
         files, key=lambda x: x["path"]
     ):  # Renamed 'file' to 'file_item'
-        content_text += f"\n---\nFile: {file_item['path']}\n---\n{file_item.get('content', 'Error reading content or binary file.')}\n"
-    return structure_text + content_text
+        yield f"{separator}\n---\nFile: {file_item['path']}\n---\n"
+        yield file_item.get("content", "Error reading content or binary file.")
+        # Each section's trailing newline is emitted with the next header (or last)
+        separator = "\n"
+    yield separator
+
+
+def format_repo_contents(files: List[dict]) -> str:
+    """Format repository contents into LLM-friendly text with directory structure."""
+    return "".join(iter_format_repo_contents(files))
 
 
 def cleanup_temp_files(temp_dirs: List[str]):
     """Clean up temporary directories."""
     for temp_dir in temp_dirs:
-        if temp_dir and os.path.exists(
-            temp_dir
-        ):  # Check if temp_dir is not None or empty
-            shutil.rmtree(temp_dir, ignore_errors=True)
\ No newline at end of file
+        if temp_dir:  # Check if temp_dir is not None or empty
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+# Removing an extracted repository is thousands of unlink calls; a small dedicated
+# pool does it so neither the event loop nor the shared request threadpool waits on it
+_cleanup_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="temp-cleanup")
+
+
+def schedule_cleanup_temp_files(temp_dirs: List[str]) -> None:
+    """Remove temporary directories on a background thread and return immediately."""
+    if temp_dirs:
+        _cleanup_pool.submit(cleanup_temp_files, list(temp_dirs))
\ No newline at end of file
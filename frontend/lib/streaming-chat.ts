@@ -101,6 +101,8 @@ export async function* parseStreamingResponse(
   const decoder = new TextDecoder();
   let buffer = '';
   let hasReceivedData = false;
+  // Stream identifiers arrive once in the opening 'start' event
+  let streamMeta: Pick<StreamingChunk, 'chat_id' | 'conversation_id' | 'provider' | 'model'> = {};
 
   try {
     while (true) {
@@ -124,6 +126,16 @@ export async function* parseStreamingResponse(
 
           // Map backend events to our StreamingChunk format
           switch (data.event) {
+            case 'start':
+              streamMeta = {
+                chat_id: data.chat_id,
+                conversation_id: data.conversation_id,
+                provider: data.provider,
+                model: data.model,
+              };
+              yield { type: 'metadata', ...streamMeta };
+              break;
+
             case 'progress':
               yield {
                 type: 'progress',
@@ -153,7 +165,7 @@ export async function* parseStreamingResponse(
               break;
 
             case 'token':
-              // First token in the stream contains metadata
+              // Older backends send metadata on token events instead of a 'start' event
               if (data.chat_id && data.conversation_id) {
                 yield {
                   type: 'metadata',
@@ -170,8 +182,8 @@ export async function* parseStreamingResponse(
                 yield {
                   type: 'token',
                   content: data.token, // Can be empty string
-                  chat_id: data.chat_id,
-                  conversation_id: data.conversation_id,
+                  chat_id: data.chat_id ?? streamMeta.chat_id,
+                  conversation_id: data.conversation_id ?? streamMeta.conversation_id,
                 };
               }
               break;
@@ -221,8 +233,8 @@ export async function* parseStreamingResponse(
           yield {
             type: 'token',
             content: data.token,
-            chat_id: data.chat_id,
-            conversation_id: data.conversation_id,
+            chat_id: data.chat_id ?? streamMeta.chat_id,
+            conversation_id: data.conversation_id ?? streamMeta.conversation_id,
           };
         } else if (data.event === 'complete') {
           yield {
@@ -4,6 +4,7 @@ Adapted from the archived tree_sitter_parser.py.
 """
 
 import os
+import threading
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 
@@ -16,6 +17,26 @@ GraphNodeData = Dict[str, Any]
 GraphEdgeData = Dict[str, Any]
 
 
+# Compiled queries keyed by (Language identity, query source). Compiling is the
+# costly part of building a parser and a Query is read-only once built, so one
+# compile is shared by every parser for the same grammar. The Language is kept
+# in the value so its id can't be reused while the entry exists.
+QUERY_CACHE_MAX_ENTRIES = 32
+_query_cache: Dict[Tuple[int, str], Tuple[Language, Any]] = {}
+_query_cache_lock = threading.Lock()
+
+
+def _compiled_query(language: Language, query_string: str) -> Any:
+    key = (id(language), query_string)
+    with _query_cache_lock:
+        cached = _query_cache.get(key)
+        if cached is None:
+            if len(_query_cache) >= QUERY_CACHE_MAX_ENTRIES:
+                _query_cache.clear()
+            cached = _query_cache[key] = (language, language.query(query_string))
+    return cached[1]
+
+
 class CustomTreeSitterParser:
     """
     Parser that uses tree-sitter to extract code structure.
@@ -36,7 +57,7 @@ class CustomTreeSitterParser:
         self.parser = Parser()
         self.parser.language = language
         self.ts_language = language  # Store the language object
-        self.query = self.ts_language.query(query_string)
+        self.query = _compiled_query(self.ts_language, query_string)
         self.project_root_path = (
             Path(project_root_path)
             if isinstance(project_root_path, str)
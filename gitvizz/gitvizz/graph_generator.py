@@ -5,6 +5,7 @@ import ast
 import zipfile
 import tempfile
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from typing import List, Dict, Any, Tuple, Optional, Union
 from pathlib import Path
 from pyvis.network import Network
@@ -759,6 +760,23 @@ class JavaScriptParser(LanguageParser):  # This is the old regex-based parser
         return nodes_data, edges_data
 
 
+_TREE_SITTER_LANGUAGES = {
+    "javascript": lambda: tree_sitter_javascript.language(),
+    "typescript": lambda: tree_sitter_typescript.language_typescript(),
+    "tsx": lambda: tree_sitter_typescript.language_tsx(),
+}
+
+
+@lru_cache(maxsize=None)
+def _tree_sitter_language(name: str) -> Language:
+    """Load a Tree-sitter grammar once per process and share it across generators.
+
+    Returning the same Language object also lets CustomTreeSitterParser reuse
+    its compiled queries between requests.
+    """
+    return Language(_TREE_SITTER_LANGUAGES[name]())
+
+
 class ReactParser(LanguageParser):  # Changed from JavaScriptParser
     def __init__(self, project_root_path: Path):
         self.project_root_path = project_root_path
@@ -767,7 +785,7 @@ class ReactParser(LanguageParser):  # Changed from JavaScriptParser
         # Let's assume tree_sitter_typescript.language_tsx() is good for .jsx
         # and tree_sitter_javascript.language() for .js
         try:
-            js_lang = Language(tree_sitter_javascript.language())
+            js_lang = _tree_sitter_language("javascript")
             self.js_ts_parser = CustomTreeSitterParser(
                 language=js_lang,
                 query_string=JS_JSX_QUERY,  # A query that works for JS
@@ -778,9 +796,7 @@ class ReactParser(LanguageParser):  # Changed from JavaScriptParser
             self.js_ts_parser = None
 
         try:
-            jsx_lang = Language(
-                tree_sitter_typescript.language_tsx()
-            )  # TSX lang for .jsx
+            jsx_lang = _tree_sitter_language("tsx")  # TSX lang for .jsx
             self.jsx_ts_parser = CustomTreeSitterParser(
                 language=jsx_lang,
                 query_string=JS_JSX_QUERY,  # A query that works for JSX
@@ -883,7 +899,7 @@ class NextJSParser(ReactParser):
         )  # Initializes JS/JSX parsers from ReactParser
 
         try:
-            ts_lang = Language(tree_sitter_typescript.language_typescript())
+            ts_lang = _tree_sitter_language("typescript")
             self.ts_parser = CustomTreeSitterParser(
                 language=ts_lang,
                 query_string=TS_TSX_QUERY,  # Query for .ts files
@@ -894,7 +910,7 @@ class NextJSParser(ReactParser):
             self.ts_parser = None
 
         try:
-            tsx_lang = Language(tree_sitter_typescript.language_tsx())
+            tsx_lang = _tree_sitter_language("tsx")
             self.tsx_parser = CustomTreeSitterParser(
                 language=tsx_lang,
                 query_string=TS_TSX_QUERY,  # Query for .tsx files